@@ -3,7 +3,7 @@ import gc
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from batch.utils.settings_check import check_settings
 from batch.utils.video_processor import process_video
-from core.config_utils import load_key, update_key
+from core.config_utils import load_key, config_overlay
 import pandas as pd
 from rich.console import Console
 from rich.panel import Panel
@@ -12,16 +12,15 @@ import shutil
 
 console = Console()
 
-def record_and_update_config(source_language, target_language):
-    original_source_lang = load_key('whisper.language')
-    original_target_lang = load_key('target_language')
-    
+def build_task_overrides(source_language, target_language):
+    """Job-scoped config overrides for one task, applied via config_overlay instead of config.yaml"""
+    # 转录时写回的检测语言只属于当前任务, 始终放进覆盖层
+    overrides = {'whisper.detected_language': load_key('whisper.detected_language')}
     if source_language and not pd.isna(source_language):
-        update_key('whisper.language', source_language)
+        overrides['whisper.language'] = source_language
     if target_language and not pd.isna(target_language):
-        update_key('target_language', target_language)
-    
-    return original_source_lang, original_target_lang
+        overrides['target_language'] = target_language
+    return overrides
 
 def process_batch():
     if not check_settings():
@@ -68,20 +67,18 @@ def process_batch():
             source_language = row['Source Language']
             target_language = row['Target Language']
             
-            original_source_lang, original_target_lang = record_and_update_config(source_language, target_language)
+            overrides = build_task_overrides(source_language, target_language)
             
             try:
                 dubbing = 0 if pd.isna(row['Dubbing']) else int(row['Dubbing'])
                 is_retry = not pd.isna(row['Status']) and 'Error' in str(row['Status'])
-                status, error_step, error_message = process_video(video_file, dubbing, is_retry)
+                with config_overlay(overrides):
+                    status, error_step, error_message = process_video(video_file, dubbing, is_retry)
                 status_msg = "Done" if status else f"Error: {error_step} - {error_message}"
             except Exception as e:
                 status_msg = f"Error: Unhandled exception - {str(e)}"
                 console.print(f"[bold red]Error processing {video_file}: {status_msg}")
             finally:
-                update_key('whisper.language', original_source_lang)
-                update_key('target_language', original_target_lang)
-                
                 df.at[index, 'Status'] = status_msg
                 df.to_excel('batch/tasks_setting.xlsx', index=False)
                 
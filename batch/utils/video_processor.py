@@ -89,9 +89,13 @@ def process_input_file(file):
 
 def split_sentences():
     step3_1_spacy_split.split_by_spacy()
-    step3_2_splitbymeaning.split_sentences_by_meaning()
+    if not load_key("stream_split_translate", False):
+        step3_2_splitbymeaning.split_sentences_by_meaning()
 
 def summarize_and_translate():
+    if load_key("stream_split_translate", False):
+        step4_2_translate_all.split_and_translate_all()
+        return
     step4_1_summarize.get_summary()
     step4_2_translate_all.translate_all()
 
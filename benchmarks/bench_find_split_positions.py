@@ -0,0 +1,91 @@
+"""Benchmark find_split_positions against the previous per-offset SequenceMatcher scan
+
+    python benchmarks/bench_find_split_positions.py [repeat]
+
+Each sentence length is timed twice: with the LLM's split text identical to the
+original (the direct path) and with ~10% of its tokens dropped, replaced or
+punctuated, as models do when they "fix" a transcript (the alignment path).
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import random
+import time
+from difflib import SequenceMatcher
+from rich.console import Console
+from rich.table import Table
+from rich import box
+import core.step3_2_splitbymeaning as splitbymeaning
+
+console = Console()
+
+WORDS = "the model splits every long subtitle line into shorter parts at natural pauses so viewers can read them".split()
+REWRITES = {"gonna": "going to", "wanna": "want to", "kinda": "kind of", "the": "a", "every": "each", "them": "it"}
+
+def scan_split_positions(original, modified):
+    """The implementation find_split_positions replaced, minus its warnings (space joiner)"""
+    split_positions, start = [], 0
+    parts = modified.split('[br]')
+    for i in range(len(parts) - 1):
+        modified_left = ' '.join(parts[i].split())
+        best_split = max(range(start, len(original)), key=lambda j: SequenceMatcher(None, original[start:j], modified_left).ratio())
+        split_positions.append(best_split)
+        start = best_split
+    return split_positions
+
+def rewrite(tokens, rng, rate=0.1):
+    """Mimic an LLM touching up the transcript: drop fillers, expand/replace words, add punctuation
+
+    Returns (index in tokens, rewritten token) pairs for the tokens that were kept.
+    """
+    rewritten = []
+    for i, token in enumerate(tokens):
+        roll = rng.random()
+        if roll < rate / 3:
+            continue
+        if roll < rate * 2 / 3:
+            token = REWRITES.get(token, token.capitalize())
+        elif roll < rate:
+            token += ','
+        rewritten.append((i, token))
+    return rewritten
+
+def make_case(num_tokens, rng, rewritten):
+    """(original, marked, truth): truth holds the (earliest, latest) correct offset for each [br]"""
+    tokens = [rng.choice(WORDS + list(REWRITES)) for _ in range(num_tokens)]
+    modified = rewrite(tokens, rng) if rewritten else list(enumerate(tokens))
+    cuts = sorted(rng.sample(range(5, len(modified) - 5), 3))
+    marked = ' '.join(token + (' [br]' if i + 1 in cuts else '') for i, (_, token) in enumerate(modified))
+    starts = [sum(len(token) + 1 for token in tokens[:i]) for i in range(len(tokens))]
+    # anything between the last kept token of the left part and the first of the right part is a correct cut
+    truth = [(starts[modified[cut - 1][0]] + len(tokens[modified[cut - 1][0]]), starts[modified[cut][0]]) for cut in cuts]
+    return ' '.join(tokens), marked, truth
+
+def max_error(positions, truth):
+    """Largest distance in characters from a returned offset to its correct range"""
+    return max(max(low - pos, pos - high, 0) for pos, (low, high) in zip(positions, truth))
+
+def time_call(func, original, marked, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        positions = func(original, marked)
+    return (time.perf_counter() - started) / repeat, positions
+
+def main(repeat=20):
+    rng = random.Random(0)
+    splitbymeaning.console.quiet = True  # low-similarity warnings are expected on rewritten input
+    table = Table(title="find_split_positions", box=box.ROUNDED)
+    for column in ("tokens", "input", "scan ms", "aligned ms", "speed-up", "scan error", "aligned error"):
+        table.add_column(column, justify="right")
+    for num_tokens in (60, 80, 100):
+        for rewritten in (False, True):
+            original, marked, truth = make_case(num_tokens, rng, rewritten)
+            scan_time, scan_positions = time_call(scan_split_positions, original, marked, repeat)
+            aligned_time, aligned_positions = time_call(splitbymeaning.find_split_positions, original, marked, repeat)
+            table.add_row(str(num_tokens), "rewritten" if rewritten else "identical",
+                          f"{scan_time * 1000:.1f}", f"{aligned_time * 1000:.3f}",
+                          f"{scan_time / aligned_time:.0f}x",
+                          f"{max_error(scan_positions, truth)} chars", f"{max_error(aligned_positions, truth)} chars")
+    console.print(table)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
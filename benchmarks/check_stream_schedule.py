@@ -0,0 +1,74 @@
+"""Check that the streaming pipeline translates early chunks while later sentences are still being split
+
+    python benchmarks/check_stream_schedule.py [task seconds]
+
+The LLM split and translate calls are replaced by fixed sleeps, and both stages run on one
+shared max_workers pool, as in split_and_translate_all. Translation of chunk 0 has to
+start before the last split group does; otherwise the stages ran back to back.
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import concurrent.futures
+import threading
+import time
+from rich.console import Console
+from core.config_utils import config_overlay
+import core.step3_2_splitbymeaning as splitbymeaning
+import core.step4_2_translate_all as translate_all
+
+console = Console()
+
+MAX_WORKERS = 4
+SPLIT_GROUPS = 25
+BATCH_SIZE = 4
+MAX_LENGTH = 20
+
+class WordCounter:
+    def count(self, sentences):
+        return [len(sentence.split()) for sentence in sentences]
+
+def main(task_seconds=0.2):
+    started = time.perf_counter()
+    events = {'split': [], 'translate': []}
+    lock = threading.Lock()
+
+    def record(kind, label, begin):
+        with lock:
+            events[kind].append((label, begin - started, time.perf_counter() - started))
+
+    def fake_split(group, max_length, token_counter):
+        begin = time.perf_counter()
+        time.sleep(task_seconds)
+        record('split', group[0][0], begin)
+        return {index: [' '.join(sentence.split()[:max_length]), ' '.join(sentence.split()[max_length:])] for index, sentence, _ in group}
+
+    def fake_translate(chunk, chunks, theme_prompt, i):
+        begin = time.perf_counter()
+        time.sleep(task_seconds)
+        record('translate', i, begin)
+        return i, chunk, chunk
+
+    splitbymeaning.split_until_fit = fake_split
+    translate_all.translate_chunk = fake_translate
+    sentences = [' '.join(f'w{i}_{j}' for j in range(2 * MAX_LENGTH)) for i in range(SPLIT_GROUPS * BATCH_SIZE)]
+
+    with config_overlay({'max_workers': MAX_WORKERS, 'split_batch_size': BATCH_SIZE}):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            split_stream = splitbymeaning.iter_split_sentences(sentences, MAX_LENGTH, executor, WordCounter())
+            chunk_stream = translate_all.iter_chunks(split_stream, max_tokens=0)
+            results = list(translate_all.iter_translations(chunk_stream, None, lambda: None, executor))
+
+    total = time.perf_counter() - started
+    last_split_start = max(begin for _, begin, _ in events['split'])
+    last_split_end = max(end for _, _, end in events['split'])
+    chunk0_start = next(begin for i, begin, _ in events['translate'] if i == 0)
+    ideal = (SPLIT_GROUPS + len(results)) * task_seconds / MAX_WORKERS
+    console.print(f"{SPLIT_GROUPS} split groups and {len(results)} chunks on {MAX_WORKERS} workers, {task_seconds}s per task")
+    console.print(f"splitting ran until {last_split_end:.2f}s (last group started {last_split_start:.2f}s), chunk 0 translated at {chunk0_start:.2f}s")
+    console.print(f"total {total:.2f}s ({ideal:.2f}s if the pool never idles)")
+    assert [r[0] for r in results] == list(range(len(results))), "results out of order"
+    assert chunk0_start < last_split_start, "chunk 0 waited for the whole split backlog"
+    console.print("[green]✅ chunk 0 was translated while later groups were still being split[/green]")
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.2)
@@ -1,10 +1,10 @@
-from openai import OpenAI
 from pathlib import Path
 import base64
 import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 from core.config_utils import load_key
+from core.ask_gpt import get_openai_client
 
 def wav_to_base64(wav_file_path):
     with open(wav_file_path, 'rb') as audio_file:
@@ -37,10 +37,7 @@ def cosyvoice_tts_for_videolingo(text, save_as, number, task_df):
     # 转换参考音频为 base64
     reference_base64 = wav_to_base64(ref_audio_path)
     
-    client = OpenAI(
-        api_key=API_KEY,
-        base_url="https://api.siliconflow.cn/v1"
-    )
+    client = get_openai_client(API_KEY, "https://api.siliconflow.cn/v1")
 
     save_path = Path(save_as)
     save_path.parent.mkdir(parents=True, exist_ok=True)
@@ -5,7 +5,7 @@ import base64
 import uuid
 from typing import List, Tuple
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
-from core.config_utils import load_key, update_key
+from core.config_utils import load_key, update_keys
 from core.step1_ytdlp import find_video_files
 from core.all_whisper_methods.audio_preprocess import get_audio_duration
 import hashlib
@@ -227,8 +227,7 @@ def siliconflow_fish_tts_for_videolingo(text, save_as, number, task_df):
                 return siliconflow_fish_tts(text, save_as, mode="preset")
                 
             voice_id = create_custom_voice(ref_audio, ref_text, custom_name)
-            update_key("sf_fish_tts.voice_id", voice_id)
-            update_key("sf_fish_tts.custom_name", custom_name)
+            update_keys({"sf_fish_tts.voice_id": voice_id, "sf_fish_tts.custom_name": custom_name})
         else:
             voice_id = load_key("sf_fish_tts.voice_id")
         return siliconflow_fish_tts(text=text, save_path=save_as, mode="custom", voice_id=voice_id)
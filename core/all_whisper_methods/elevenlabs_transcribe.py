@@ -82,18 +82,12 @@ def transcribe_audio_elevenlabs(raw_audio_path: str, vocal_audio_path: str, star
         with open(LOG_FILE, "r", encoding="utf-8") as f:
             return json.load(f)
     
-    # Load audio and process start/end parameters
-    y, sr = librosa.load(vocal_audio_path, sr=16000)
-    audio_duration = len(y) / sr
-    
+    # Load only the start/end slice, so concurrent segments don't each hold the whole track
     if start is None or end is None:
+        y_slice, sr = librosa.load(vocal_audio_path, sr=16000)
         start = 0
-        end = audio_duration
-    
-    # Slice audio based on start/end
-    start_sample = int(start * sr)
-    end_sample = int(end * sr)
-    y_slice = y[start_sample:end_sample]
+    else:
+        y_slice, sr = librosa.load(vocal_audio_path, sr=16000, offset=start, duration=end - start)
     
     # Create temporary file for the sliced audio
     with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
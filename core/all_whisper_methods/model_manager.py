@@ -0,0 +1,74 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import gc
+import threading
+from collections import OrderedDict
+import torch
+from rich import print as rprint
+from core.config_utils import load_key
+
+# Size assumed for a model when memory use can't be measured (CPU without psutil)
+NOMINAL_MODEL_BYTES = 1024 ** 3
+
+def _used_memory():
+    if torch.cuda.is_available():
+        free, total = torch.cuda.mem_get_info()
+        return total - free
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+class ModelManager:
+    """Keeps loaded ASR/alignment models resident across segments and videos, least recently used first out
+
+    Each model's footprint is measured as the device (or process) memory it added when
+    loaded; once the resident models exceed the budget the least recently used are freed.
+    The last measured size is remembered, so room can be made before a reload.
+
+        model = manager.get(('asr', name, compute_type, language), lambda: whisperx.load_model(...), budget)
+    """
+
+    def __init__(self):
+        self._models = OrderedDict()  # key -> (model, size in bytes)
+        self._sizes = {}
+        self._lock = threading.RLock()
+
+    def get(self, key, loader, budget):
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            if budget <= 0:
+                return loader()
+            self._evict(budget - self._sizes.get(key, 0))
+            before = _used_memory()
+            model = loader()
+            after = _used_memory()
+            size = max(after - before, 0) if before is not None and after is not None else NOMINAL_MODEL_BYTES
+            self._sizes[key] = size
+            self._models[key] = (model, size)
+            self._evict(budget, keep=key)
+            return model
+
+    def _evict(self, limit, keep=None):
+        evicted = False
+        while sum(size for _, size in self._models.values()) > limit:
+            key = next((k for k in self._models if k != keep), None)
+            if key is None:
+                break
+            self._models.pop(key)
+            rprint(f"[cyan]♻️ Unloading model {key[:2]} to stay within the model cache budget[/cyan]")
+            evicted = True
+        if evicted:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+_manager = ModelManager()
+
+def get_model(key, loader):
+    """Return the cached model for key, loading it with loader() under the whisper.model_cache_gb budget"""
+    budget = int(load_key("whisper.model_cache_gb", 6) * 1024 ** 3)
+    return _manager.get(key, loader, budget)
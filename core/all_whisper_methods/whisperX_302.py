@@ -22,17 +22,12 @@ def transcribe_audio_302(raw_audio_path: str, vocal_audio_path: str, start: floa
     save_language(WHISPER_LANGUAGE) # since 302ai doesn't return language
     url = "https://api.302.ai/302/whisperx"
     
-    # 加载音频并处理start和end参数
-    y, sr = librosa.load(vocal_audio_path, sr=16000)
-    audio_duration = len(y) / sr
-    
+    # 只加载 start 到 end 的音频, 并发转录时不必每个线程都读入整段音频
     if start is None or end is None:
+        y_slice, sr = librosa.load(vocal_audio_path, sr=16000)
         start = 0
-        end = audio_duration
-        
-    start_sample = int(start * sr)
-    end_sample = int(end * sr)
-    y_slice = y[start_sample:end_sample]
+    else:
+        y_slice, sr = librosa.load(vocal_audio_path, sr=16000, offset=start, duration=end - start)
     
     # 将音频数据直接写入内存缓冲区
     audio_buffer = io.BytesIO()
@@ -7,14 +7,22 @@ import whisperx
 import torch
 import time
 import subprocess
+import json
 from typing import Dict
 from rich import print as rprint
 import librosa
 from core.config_utils import load_key
 from core.all_whisper_methods.audio_preprocess import save_language
+from core.all_whisper_methods.model_manager import get_model
 import numpy as np
 
 MODEL_DIR = load_key("model_dir")
+# Lists models shipped in MODEL_DIR so no-egress machines never need the network, e.g.
+# {"whisper": {"large-v3": "large-v3"}, "align": {"ja": "wav2vec2-large-xlsr-53-japanese"}}
+MANIFEST_FILE = os.path.join(MODEL_DIR, "manifest.json")
+MIRROR_CACHE_FILE = os.path.join(MODEL_DIR, "hf_mirror.json")
+# HF_ENDPOINT set before we started overrides mirror selection
+USER_HF_ENDPOINT = os.environ.get('HF_ENDPOINT')
 
 def check_hf_mirror() -> str:
     """Check and return the fastest HF mirror"""
@@ -46,6 +54,53 @@ def check_hf_mirror() -> str:
     rprint(f"[cyan]🚀 Selected mirror:[/cyan] {fastest_url} ({best_time:.2f}s)")
     return fastest_url
 
+def get_hf_endpoint() -> str:
+    """The HF endpoint to download from, probing mirrors at most once per whisper.hf_mirror_ttl_hours
+    
+    The choice is remembered in MODEL_DIR so it survives restarts; a user-set HF_ENDPOINT
+    always wins, and with HF_HUB_OFFLINE set nothing is probed.
+    """
+    if USER_HF_ENDPOINT:
+        return USER_HF_ENDPOINT
+    default = "https://huggingface.co"
+    if os.environ.get('HF_HUB_OFFLINE', '0') not in ('', '0'):
+        return default
+    ttl = load_key("whisper.hf_mirror_ttl_hours", 24) * 3600
+    try:
+        with open(MIRROR_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if time.time() - cached['checked_at'] < ttl:
+            return cached['endpoint']
+    except (OSError, ValueError, KeyError):
+        pass
+    endpoint = check_hf_mirror()
+    try:
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        with open(MIRROR_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'endpoint': endpoint, 'checked_at': time.time()}, f)
+    except OSError:
+        pass
+    return endpoint
+
+def use_hf_endpoint():
+    os.environ['HF_ENDPOINT'] = get_hf_endpoint()
+
+def resolve_local_model(kind: str, name: str, default_dir: str = None):
+    """Local path of a model from the MODEL_DIR manifest, else default_dir if it exists, else None"""
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            entry = json.load(f).get(kind, {}).get(name)
+    except (OSError, ValueError, AttributeError):
+        entry = None
+    if entry:
+        path = entry if os.path.isabs(entry) else os.path.join(MODEL_DIR, entry)
+        if os.path.exists(path):
+            return path
+        rprint(f"[yellow]⚠️ Manifest entry {kind}/{name} not found at {path}[/yellow]")
+    if default_dir and os.path.exists(default_dir):
+        return default_dir
+    return None
+
 def load_audio_segment(audio_file: str, start: float, end: float) -> np.ndarray:
     """load audio segment from audio file"""
     duration = end - start
@@ -59,7 +114,6 @@ def load_audio_segment(audio_file: str, start: float, end: float) -> np.ndarray:
     return audio
 
 def transcribe_audio(raw_audio_file: str, vocal_audio_file: str, start: float, end: float) -> Dict:
-    os.environ['HF_ENDPOINT'] = check_hf_mirror()
     WHISPER_LANGUAGE = load_key("whisper.language")
     device = "cuda" if torch.cuda.is_available() else "cpu"
     rprint(f"🚀 Starting WhisperX using device: {device} ...")
@@ -78,22 +132,24 @@ def transcribe_audio(raw_audio_file: str, vocal_audio_file: str, start: float, e
     try:
         if WHISPER_LANGUAGE == 'zh':
             model_name = "Huan69/Belle-whisper-large-v3-zh-punct-fasterwhisper"
-            local_model = os.path.join(MODEL_DIR, "Belle-whisper-large-v3-zh-punct-fasterwhisper")
+            local_model = resolve_local_model("whisper", model_name, os.path.join(MODEL_DIR, "Belle-whisper-large-v3-zh-punct-fasterwhisper"))
         else:
             model_name = load_key("whisper.model")
-            local_model = os.path.join(MODEL_DIR, model_name)
+            local_model = resolve_local_model("whisper", model_name, os.path.join(MODEL_DIR, model_name))
             
-        if os.path.exists(local_model):
+        if local_model:
             rprint(f"[green]📥 Loading local WHISPER model:[/green] {local_model} ...")
             model_name = local_model
         else:
+            use_hf_endpoint()
             rprint(f"[green]📥 Using WHISPER model from HuggingFace:[/green] {model_name} ...")
 
         vad_options = {"vad_onset": 0.500,"vad_offset": 0.363}
         asr_options = {"temperatures": [0],"initial_prompt": "",}
         whisper_language = None if 'auto' in WHISPER_LANGUAGE else WHISPER_LANGUAGE
         rprint("[bold yellow] You can ignore warning of `Model was trained with torch 1.10.0+cu102, yours is 2.0.0+cu118...`[/bold yellow]")
-        model = whisperx.load_model(model_name, device, compute_type=compute_type, language=whisper_language, vad_options=vad_options, asr_options=asr_options, download_root=MODEL_DIR)
+        model = get_model(('asr', model_name, device, compute_type, whisper_language),
+                          lambda: whisperx.load_model(model_name, device, compute_type=compute_type, language=whisper_language, vad_options=vad_options, asr_options=asr_options, download_root=MODEL_DIR))
 
         raw_audio_segment = load_audio_segment(raw_audio_file, start, end)
         vocal_audio_segment = load_audio_segment(vocal_audio_file, start, end)
@@ -101,7 +157,7 @@ def transcribe_audio(raw_audio_file: str, vocal_audio_file: str, start: float, e
         rprint("[bold green]Note: You will see Progress if working correctly ↓[/bold green]")
         result = model.transcribe(raw_audio_segment, batch_size=batch_size, print_progress=True)
 
-        # Free GPU resources
+        # Drop our reference, the model manager decides whether it stays resident
         del model
         torch.cuda.empty_cache()
 
@@ -111,7 +167,10 @@ def transcribe_audio(raw_audio_file: str, vocal_audio_file: str, start: float, e
             raise ValueError("Please specify the transcription language as zh and try again!")
 
         # Align timestamps using vocal audio
-        model_a, metadata = whisperx.load_align_model(language_code=result["language"], device=device)
+        align_model = resolve_local_model("align", result["language"])
+        if align_model is None:
+            use_hf_endpoint()
+        model_a, metadata = get_model(('align', result["language"], device), lambda: whisperx.load_align_model(language_code=result["language"], device=device, model_name=align_model))
         result = whisperx.align(result["segments"], model_a, metadata, vocal_audio_segment, device, return_char_alignments=False)
 
         # Free GPU resources again
@@ -1,47 +1,27 @@
 import os, sys, json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from threading import Lock
 import json_repair
 import json 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+import httpx
+import asyncio
+import threading
+import weakref
 import time
-from requests.exceptions import RequestException
 from core.config_utils import load_key
-
-LOG_FOLDER = 'output/gpt_log'
-LOCK = Lock()
+from core.gpt_cache import get_cached_response, cache_response, write_log_async
+from core.retry_policy import RetryState
+from core.stream_json import IncrementalJSONObjectParser
+from core.llm_metrics import LLMCall
 
 def save_log(model, prompt, response, log_title = 'default', message = None):
-    os.makedirs(LOG_FOLDER, exist_ok=True)
     log_data = {
         "model": model,
         "prompt": prompt,
         "response": response,
         "message": message
     }
-    log_file = os.path.join(LOG_FOLDER, f"{log_title}.json")
-    
-    if os.path.exists(log_file):
-        with open(log_file, 'r', encoding='utf-8') as f:
-            logs = json.load(f)
-    else:
-        logs = []
-    logs.append(log_data)
-    with open(log_file, 'w', encoding='utf-8') as f:
-        json.dump(logs, f, ensure_ascii=False, indent=4)
-        
-def check_ask_gpt_history(prompt, model, log_title):
-    # check if the prompt has been asked before
-    if not os.path.exists(LOG_FOLDER):
-        return False
-    file_path = os.path.join(LOG_FOLDER, f"{log_title}.json")
-    if os.path.exists(file_path):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            for item in data:
-                if item["prompt"] == prompt:
-                    return item["response"]
-    return False
+    write_log_async(log_title, log_data)
 
 def fix_base_url(base_url):
     # huoshan
@@ -53,72 +33,270 @@ def fix_base_url(base_url):
         base_url = base_url.strip('/') + '/v1'
     return base_url
 
-def ask_gpt(prompt, response_json=True, valid_def=None, log_title='default'):
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_openai_client(api_key, base_url):
+    """Return a process-wide OpenAI client for (base_url, api_key)
+
+    The underlying httpx pool keeps connections alive and is sized to max_workers,
+    so every worker thread reuses a warm TLS connection instead of opening a new one.
+    The client keeps the SDK's default retries for direct callers (e.g. TTS); ask_gpt
+    turns them off per call since its retries go through core.retry_policy.
+    """
+    pool_size = max(int(load_key("max_workers", 4)), 1)
+    cache_key = (base_url, api_key, pool_size)
+    client = _CLIENTS.get(cache_key)
+    if client is not None:
+        return client
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(cache_key)
+        if client is None:
+            http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=pool_size * 2, max_keepalive_connections=pool_size, keepalive_expiry=60),
+                timeout=httpx.Timeout(600, connect=10),
+            )
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            _CLIENTS[cache_key] = client
+    return client
+
+def _prepare_request(prompt, response_json, log_title):
+    """Resolve api settings and completion args shared by ask_gpt and ask_gpt_async"""
     api_set = load_key("api")
     llm_support_json = load_key("llm_support_json")
-    with LOCK:
-        history_response = check_ask_gpt_history(prompt, api_set["model"], log_title)
-        if history_response:
-            return history_response
+    response_format = {"type": "json_object"} if response_json and api_set["model"] in llm_support_json else None
+    completion_args = {
+        "model": api_set["model"],
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    if response_format is not None:
+        completion_args["response_format"] = response_format
+    return {
+        "api_set": api_set,
+        "base_url": fix_base_url(api_set["base_url"]),
+        "completion_args": completion_args,
+        # log_title 'None' means a live check (e.g. API validation), never served from or written to the cache
+        "use_cache": log_title not in (None, 'None'),
+        "cache_format": [response_json, response_format],
+    }
+
+def _lookup_cache(request, prompt):
+    if not request["use_cache"]:
+        return None
+    return get_cached_response(request["api_set"]["model"], prompt, request["cache_format"])
+
+def _parse_response(content, prompt, model, response_json, valid_def):
+    """Parse the raw completion and run valid_def on it, raising on bad output"""
+    if not response_json:
+        return content
+    try:
+        response_data = json_repair.loads(content)
+    except Exception:
+        print(f"❎ json_repair parsing failed. Retrying: '''{content}'''")
+        save_log(model, prompt, content, log_title="error", message=f"json_repair parsing failed.")
+        raise
+    # check if the response is valid, otherwise save the log and raise error and retry
+    if valid_def:
+        valid_response = valid_def(response_data)
+        if valid_response['status'] != 'success':
+            save_log(model, prompt, response_data, log_title="error", message=valid_response['message'])
+            raise ValueError(f"❎ API response error: {valid_response['message']}")
+    return response_data
+
+def _finish_request(request, prompt, response_data, log_title):
+    if request["use_cache"]:
+        cache_response(request["api_set"]["model"], prompt, request["cache_format"], response_data)
+        save_log(request["api_set"]["model"], prompt, response_data, log_title=log_title)
+
+def ask_gpt(prompt, response_json=True, valid_def=None, log_title='default', stream=False, valid_item=None):
+    """Ask the configured LLM, returning the parsed JSON (or raw text when response_json is False)
+
+    With stream=True a generator of (key, value) members of the JSON object is returned
+    instead; see ask_gpt_stream.
+    """
+    if stream:
+        return ask_gpt_stream(prompt, valid_def=valid_def, valid_item=valid_item, log_title=log_title)
+    call = LLMCall(log_title)
+    request = _prepare_request(prompt, response_json, log_title)
+    history_response = _lookup_cache(request, prompt)
+    if history_response:
+        call.cache_hit()
+        return history_response
     
+    api_set = request["api_set"]
     if not api_set["key"]:
         raise ValueError(f"⚠️API_KEY is missing")
     
-    messages = [{"role": "user", "content": prompt}]
-    
-    base_url = fix_base_url(api_set["base_url"])
-    client = OpenAI(api_key=api_set["key"], base_url=base_url)
-    response_format = {"type": "json_object"} if response_json and api_set["model"] in llm_support_json else None
+    # retries are handled by core.retry_policy, not the SDK
+    client = get_openai_client(api_set["key"], request["base_url"]).with_options(max_retries=0)
 
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            completion_args = {
-                "model": api_set["model"],
-                "messages": messages
-            }
-            if response_format is not None:
-                completion_args["response_format"] = response_format
-                
-            response = client.chat.completions.create(**completion_args)
-            
-            if response_json:
-                try:
-                    response_data = json_repair.loads(response.choices[0].message.content)
-                    
-                    # check if the response is valid, otherwise save the log and raise error and retry
-                    if valid_def:
-                        valid_response = valid_def(response_data)
-                        if valid_response['status'] != 'success':
-                            save_log(api_set["model"], prompt, response_data, log_title="error", message=valid_response['message'])
-                            raise ValueError(f"❎ API response error: {valid_response['message']}")
-                        
-                    break  # Successfully accessed and parsed, break the loop
-                except Exception as e:
-                    response_data = response.choices[0].message.content
-                    print(f"❎ json_repair parsing failed. Retrying: '''{response_data}'''")
-                    save_log(api_set["model"], prompt, response_data, log_title="error", message=f"json_repair parsing failed.")
-                    if attempt == max_retries - 1:
-                        raise Exception(f"JSON parsing still failed after {max_retries} attempts: {e}\n Please check your network connection or API key or `output/gpt_log/error.json` to debug.")
-            else:
-                response_data = response.choices[0].message.content
-                break  # Non-JSON format, break the loop directly
-                
-        except Exception as e:
-            if attempt < max_retries - 1:
-                if isinstance(e, RequestException):
-                    print(f"Request error: {e}. Retrying ({attempt + 1}/{max_retries})...")
-                else:
-                    print(f"Unexpected error occurred: {e}\nRetrying...")
-                time.sleep(2)
-            else:
-                raise Exception(f"Still failed after {max_retries} attempts: {e}")
-    with LOCK:
-        if log_title != 'None':
-            save_log(api_set["model"], prompt, response_data, log_title=log_title)
+    retry = RetryState(request["base_url"])
+    try:
+        while True:
+            time.sleep(retry.wait_before_attempt())
+            try:
+                response = client.chat.completions.create(**request["completion_args"])
+                retry.on_response()
+                call.add_usage(response.usage)
+                response_data = _parse_response(response.choices[0].message.content, prompt, api_set["model"], response_json, valid_def)
+                break
+            except Exception as e:
+                time.sleep(retry.on_error(e))
+    except Exception:
+        call.finish(retry, failed=True)
+        raise
+    call.finish(retry)
+    _finish_request(request, prompt, response_data, log_title)
 
     return response_data
 
+def ask_gpt_stream(prompt, valid_def=None, valid_item=None, log_title='default'):
+    """Stream a JSON-object completion, yielding (key, value) for each top-level member as soon as it is complete
+
+    valid_item(key, value) is checked per member while streaming, so a bad line aborts
+    the request early instead of after the whole response; valid_def still checks the
+    assembled object at the end. When a retry happens after some members were yielded,
+    only members not yet yielded are yielded again.
+    """
+    call = LLMCall(log_title)
+    request = _prepare_request(prompt, True, log_title)
+    history_response = _lookup_cache(request, prompt)
+    if history_response:
+        call.cache_hit()
+        yield from history_response.items()
+        return
+
+    api_set = request["api_set"]
+    if not api_set["key"]:
+        raise ValueError(f"⚠️API_KEY is missing")
+
+    # retries are handled by core.retry_policy, not the SDK
+    client = get_openai_client(api_set["key"], request["base_url"]).with_options(max_retries=0)
+    retry = RetryState(request["base_url"])
+    yielded = {}
+    try:
+        while True:
+            time.sleep(retry.wait_before_attempt())
+            content = ''
+            try:
+                response = client.chat.completions.create(**request["completion_args"], stream=True, stream_options={"include_usage": True})
+                retry.on_response()
+                parser = IncrementalJSONObjectParser()
+                usage = None
+                try:
+                    for chunk in response:
+                        # usage arrives on the final chunk (some providers repeat a running total on every chunk)
+                        usage = getattr(chunk, 'usage', None) or usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content or ''
+                        content += delta
+                        for key, value in parser.feed(delta):
+                            if key in yielded:
+                                continue
+                            if valid_item:
+                                valid_response = valid_item(key, value)
+                                if valid_response['status'] != 'success':
+                                    save_log(api_set["model"], prompt, content, log_title="error", message=valid_response['message'])
+                                    raise ValueError(f"❎ API response error: {valid_response['message']}")
+                            yielded[key] = value
+                            yield key, value
+                finally:
+                    response.close()
+                    call.add_usage(usage)
+                # members the incremental parser could not close (e.g. a truncated object)
+                for key, value in _parse_response(content, prompt, api_set["model"], True, None).items():
+                    if key not in yielded:
+                        yielded[key] = value
+                        yield key, value
+                response_data = _parse_response(json.dumps(yielded, ensure_ascii=False), prompt, api_set["model"], True, valid_def)
+                break
+            except Exception as e:
+                time.sleep(retry.on_error(e))
+    except Exception:
+        call.finish(retry, failed=True)
+        raise
+    call.finish(retry)
+    _finish_request(request, prompt, response_data, log_title)
+
+# ------------
+# asyncio API
+# ------------
+
+# 每个事件循环各自的 AsyncOpenAI 客户端和并发限制, 它们不能跨事件循环使用
+# 驱动协程结束前需 await aclose_async_clients() 关闭连接
+_ASYNC_STATE = weakref.WeakKeyDictionary()
+
+def _get_async_state():
+    loop = asyncio.get_running_loop()
+    state = _ASYNC_STATE.get(loop)
+    if state is None:
+        limit = max(int(load_key("max_concurrent_requests", 50)), 1)
+        state = {"clients": {}, "semaphore": asyncio.Semaphore(limit), "limit": limit}
+        _ASYNC_STATE[loop] = state
+    return state
+
+def get_async_openai_client(api_key, base_url):
+    """Return the AsyncOpenAI client for (base_url, api_key) on the running event loop"""
+    state = _get_async_state()
+    client = state["clients"].get((base_url, api_key))
+    if client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=state["limit"], max_keepalive_connections=state["limit"], keepalive_expiry=60),
+            timeout=httpx.Timeout(600, connect=10),
+        )
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+        state["clients"][(base_url, api_key)] = client
+    return client
+
+async def aclose_async_clients():
+    """Close the running event loop's clients and forget its state; await it before the driver's asyncio.run returns"""
+    state = _ASYNC_STATE.pop(asyncio.get_running_loop(), None)
+    if state is None:
+        return
+    for client in state["clients"].values():
+        await client.close()
+
+async def ask_gpt_async(prompt, response_json=True, valid_def=None, log_title='default'):
+    """Coroutine version of ask_gpt
+
+    At most `max_concurrent_requests` calls are in flight per event loop, so callers
+    can gather hundreds of prompts without holding one OS thread per request.
+    """
+    call = LLMCall(log_title)
+    request = _prepare_request(prompt, response_json, log_title)
+    history_response = _lookup_cache(request, prompt)
+    if history_response:
+        call.cache_hit()
+        return history_response
+    
+    api_set = request["api_set"]
+    if not api_set["key"]:
+        raise ValueError(f"⚠️API_KEY is missing")
+    
+    client = get_async_openai_client(api_set["key"], request["base_url"])
+    semaphore = _get_async_state()["semaphore"]
+
+    retry = RetryState(request["base_url"])
+    try:
+        while True:
+            await asyncio.sleep(retry.wait_before_attempt())
+            try:
+                async with semaphore:
+                    response = await client.chat.completions.create(**request["completion_args"])
+                retry.on_response()
+                call.add_usage(response.usage)
+                response_data = _parse_response(response.choices[0].message.content, prompt, api_set["model"], response_json, valid_def)
+                break
+            except Exception as e:
+                await asyncio.sleep(retry.on_error(e))
+    except Exception:
+        call.finish(retry, failed=True)
+        raise
+    call.finish(retry)
+    _finish_request(request, prompt, response_data, log_title)
+
+    return response_data
 
 if __name__ == '__main__':
     print(ask_gpt('hi there hey response in json format, just return 200.' , response_json=True, log_title=None))
\ No newline at end of file
@@ -1,8 +1,13 @@
 from ruamel.yaml import YAML
 from typing import Any, Optional
 import os, sys
+import copy
+import tempfile
 import threading
 import logging
+import contextvars
+import functools
+from contextlib import contextmanager
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
 
@@ -87,9 +92,58 @@ def _get_nested_value(data: dict, key: str, default: Any = None) -> Any:
             return default
     return value
 
+# 进程级配置快照: (文件签名, 解析结果)
+# 签名为 (st_ino, st_mtime_ns, st_size), 文件未变化时读取无需加锁也无需重新解析
+_config_snapshot = None
+
+def _file_signature(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _set_snapshot(data: dict):
+    """写入配置后刷新快照, 调用方需持有 config_lock"""
+    global _config_snapshot
+    _config_snapshot = (_file_signature(CONFIG_PATH), data)
+
+def _get_config() -> dict:
+    """Return the parsed config, re-reading config.yaml only when it changed on disk
+    
+    The fast path is a single os.stat plus a tuple comparison and takes no lock,
+    so translate/TTS worker threads no longer serialize on config_lock.
+    """
+    signature = _file_signature(CONFIG_PATH)
+    snapshot = _config_snapshot
+    if snapshot is not None and signature is not None and snapshot[0] == signature:
+        return snapshot[1]
+    
+    with config_lock:
+        # 双重检查, 其他线程可能已经完成了重新加载
+        snapshot = _config_snapshot
+        if snapshot is not None and signature is not None and snapshot[0] == signature:
+            return snapshot[1]
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
+            data = yaml.load(file) or {}
+        _set_snapshot(data)
+        logger.debug(f"Reloaded config snapshot from {CONFIG_PATH}")
+        return data
+
+def invalidate_config_cache():
+    """Drop the in-memory snapshot so the next load_key re-reads config.yaml"""
+    global _config_snapshot
+    with config_lock:
+        _config_snapshot = None
+
 def load_key(key: str, default: Any = None) -> Any:
     """Load a key from config.yaml with thread safety
     
+    Reads go through a process-wide snapshot that is reloaded only when the
+    file's inode/mtime/size change. Containers are returned as copies so callers
+    can't mutate the shared snapshot. Values set by an active config_overlay
+    take precedence over the file.
+    
     Args:
         key: Key in dot notation (e.g. 'distributed_download.auto_process')
         default: Default value if key not found
@@ -97,16 +151,188 @@ def load_key(key: str, default: Any = None) -> Any:
     Returns:
         Value if found, default otherwise
     """
+    try:
+        data = _get_config()
+        value = _get_nested_value(data, key, default)
+        if isinstance(value, (dict, list)):
+            value = copy.deepcopy(value)
+        pending = getattr(_write_buffer, 'changes', None)
+        if pending:
+            value = _apply_changes_to_value(key, value, default, pending)
+        overlay = _config_overlay.get()
+        if overlay:
+            value = _apply_changes_to_value(key, value, default, overlay)
+        return value
+    except Exception as e:
+        logger.error(f"Failed to load key {key}: {e}", exc_info=True)
+        return default
+
+# 当前线程中 batch_config_writes 缓冲的待写入修改, None 表示不在批量写入中
+_write_buffer = threading.local()
+
+# 当前任务的配置覆盖层 (点号键 -> 值), 由 config_overlay 设置, 优先于 config.yaml
+_config_overlay: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar('config_overlay', default=None)
+
+def _set_nested_value(data: dict, key: str, value: Any):
+    """Set nested value in dictionary using dot notation, creating missing levels
+    
+    Raises:
+        ValueError: 如果路径上的某一级不是字典
+    """
+    keys = key.split('.')
+    current = data
+    for k in keys[:-1]:
+        if k not in current:
+            current[k] = {}
+        current = current[k]
+        if not isinstance(current, dict):
+            raise ValueError(f"Invalid path for key {key}: '{k}' is not a mapping")
+    current[keys[-1]] = value
+
+def _apply_changes_to_value(key: str, value: Any, default: Any, changes: dict) -> Any:
+    """把尚未写入文件的修改叠加到 load_key 读到的值上"""
+    for change_key, change_value in changes.items():
+        if change_key == key:
+            value = copy.deepcopy(change_value)
+        elif change_key.startswith(key + '.'):
+            if not isinstance(value, dict):
+                value = {}
+            _set_nested_value(value, change_key[len(key) + 1:], copy.deepcopy(change_value))
+        elif key.startswith(change_key + '.'):
+            value = copy.deepcopy(_get_nested_value(change_value, key[len(change_key) + 1:], default))
+    return value
+
+def _read_config_for_write() -> dict:
+    """读取配置文件用于修改, 调用方需持有 config_lock"""
+    if not os.path.exists(CONFIG_PATH):
+        return {}
+    try:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
+            return yaml.load(file) or {}
+    except Exception as e:
+        logger.error(f"Failed to read config file: {e}")
+        # 如果文件损坏，创建新的配置
+        return {}
+
+def _atomic_dump(data: dict):
+    """写入临时文件后 rename 覆盖 config.yaml, 读者永远不会看到写了一半的文件"""
+    config_dir = os.path.dirname(os.path.abspath(CONFIG_PATH))
+    fd, tmp_path = tempfile.mkstemp(prefix='.config.', suffix='.yaml.tmp', dir=config_dir)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            yaml.dump(data, file)
+            file.flush()
+            os.fsync(file.fileno())
+        # mkstemp 创建的文件权限为 0600, 保持与原文件一致
+        if os.path.exists(CONFIG_PATH):
+            os.chmod(tmp_path, os.stat(CONFIG_PATH).st_mode & 0o777)
+        os.replace(tmp_path, CONFIG_PATH)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def update_keys(changes: dict):
+    """批量更新配置值: 一次解析, 一次原子写入
+    
+    Args:
+        changes: 点号分隔的键到新值的映射 (例如 {'whisper.language': 'en', 'target_language': '简体中文'})
+        
+    Raises:
+        ValueError: 如果键格式不正确
+        IOError: 如果文件操作失败
+        YAMLError: 如果 YAML 解析失败
+    """
+    for key in changes:
+        if not key or not isinstance(key, str):
+            raise ValueError("Key must be a non-empty string")
+    if not changes:
+        return
+    
+    # 被当前覆盖层接管的键只写入覆盖层, 不落盘
+    overlay = _config_overlay.get()
+    if overlay:
+        scoped = {k: v for k, v in changes.items() if k in overlay}
+        if scoped:
+            overlay.update(scoped)
+            logger.debug(f"Updated overlay keys {list(scoped)}")
+            changes = {k: v for k, v in changes.items() if k not in scoped}
+            if not changes:
+                return
+    
+    # 在 batch_config_writes 中只记录修改, 退出时统一写入
+    pending = getattr(_write_buffer, 'changes', None)
+    if pending is not None:
+        pending.update(changes)
+        return
+    
     with config_lock:
         try:
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
-                data = yaml.load(file)
-            value = _get_nested_value(data, key, default)
-            logger.debug(f"Loaded key {key}: {value}")
-            return value
+            data = _read_config_for_write()
+            for key, value in changes.items():
+                _set_nested_value(data, key, value)
+            _atomic_dump(data)
+            _set_snapshot(data)
+            logger.info(f"Successfully updated keys {list(changes)}")
         except Exception as e:
-            logger.error(f"Failed to load key {key}: {e}", exc_info=True)
-            return default
+            logger.error(f"Failed to update keys {list(changes)}: {e}", exc_info=True)
+            raise
+
+@contextmanager
+def batch_config_writes():
+    """合并代码块内的 update_key/save_key/update_keys 调用, 退出时只写一次 config.yaml
+    
+    块内的 load_key 能读到尚未写入的修改。即使块内抛出异常 (例如 st.rerun),
+    已记录的修改也会被写入。嵌套使用时由最外层负责写入。
+    """
+    if getattr(_write_buffer, 'changes', None) is not None:
+        yield
+        return
+    _write_buffer.changes = {}
+    try:
+        yield
+    finally:
+        changes = _write_buffer.changes
+        _write_buffer.changes = None
+        if changes:
+            update_keys(changes)
+
+@contextmanager
+def config_overlay(overrides: dict):
+    """为当前任务设置配置覆盖层, 代码块内的 load_key 优先返回覆盖值, 不修改 config.yaml
+    
+    覆盖层保存在 contextvar 中, 并发运行的任务互不影响; 嵌套使用时内层覆盖外层。
+    块内对已被覆盖的键调用 update_key 只会修改覆盖层。线程池中的任务需要用
+    bind_config_context 包装才能看到覆盖层。
+    
+    Args:
+        overrides: 点号分隔的键到覆盖值的映射 (例如 {'whisper.language': 'ja'})
+        
+    Yields:
+        当前生效的覆盖层字典
+    """
+    parent = _config_overlay.get()
+    merged = dict(parent) if parent else {}
+    merged.update(overrides)
+    token = _config_overlay.set(merged)
+    try:
+        yield merged
+    finally:
+        _config_overlay.reset(token)
+
+def bind_config_context(func):
+    """Wrap func so it runs with the caller's config overlay, e.g. inside a ThreadPoolExecutor
+    
+    Threads don't inherit contextvars, so pool workers would otherwise read the
+    plain config.yaml values instead of the job's overlay.
+    """
+    context = contextvars.copy_context()
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # 每次调用使用独立副本, 同一个 Context 不能被多个线程同时进入
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
 
 def update_key(key: str, value: Any):
     """更新配置值
@@ -120,45 +346,7 @@ def update_key(key: str, value: Any):
         IOError: 如果文件操作失败
         YAMLError: 如果 YAML 解析失败
     """
-    if not key or not isinstance(key, str):
-        raise ValueError("Key must be a non-empty string")
-        
-    with config_lock:
-        try:         
-            # 读取现有配置
-            data = {}
-            if os.path.exists(CONFIG_PATH):
-                try:
-                    with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
-                        data = yaml.load(file) or {}
-                except Exception as e:
-                    logger.error(f"Failed to read config file: {e}")
-                    # 如果文件损坏，创建新的配置
-                    data = {}
-            
-            # 使用点号分隔的键来更新嵌套字典
-            keys = key.split('.')
-            current = data
-            for k in keys[:-1]:
-                if not isinstance(current, dict):
-                    current = {}
-                if k not in current:
-                    current[k] = {}
-                current = current[k]
-            
-            # 设置最终值
-            if not isinstance(current, dict):
-                current = {}
-            current[keys[-1]] = value
-            
-            # 保存更新后的配置
-            with open(CONFIG_PATH, 'w', encoding='utf-8') as file:
-                yaml.dump(data, file)
-            logger.info(f"Successfully updated key {key} with value {value}")
-            
-        except Exception as e:
-            logger.error(f"Failed to update key {key}: {e}", exc_info=True)
-            raise
+    update_keys({key: value})
 
 def save_key(key: str, value: Any) -> bool:
     """Save a key-value pair to config.yaml with thread safety
@@ -170,32 +358,12 @@ def save_key(key: str, value: Any) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    with config_lock:
-        try:
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
-                data = yaml.load(file)
-                
-            keys = key.split('.')
-            current = data
-            for k in keys[:-1]:
-                if isinstance(current, dict):
-                    if k not in current:
-                        current[k] = {}
-                    current = current[k]
-                else:
-                    current = {}
-                    
-            if isinstance(current, dict):
-                current[keys[-1]] = value
-                with open(CONFIG_PATH, 'w', encoding='utf-8') as file:
-                    yaml.dump(data, file)
-                logger.info(f"Successfully saved key {key} with value {value}")
-                return True
-            logger.warning(f"Failed to save key {key}: Invalid path")
-            return False
-        except Exception as e:
-            logger.error(f"Failed to save key {key}: {e}", exc_info=True)
-            return False
+    try:
+        update_keys({key: value})
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to save key {key}: {e}")
+        return False
 
 def get_auto_process_config() -> dict:
     """Get auto process configuration from YAML config
@@ -229,10 +397,11 @@ def save_auto_process_config(auto_process: bool, process_text: bool = True, proc
     }
     logger.info(f"Saving auto process config: {config}")
     
-    success = True
-    success &= save_key('distributed_download.auto_process_after_reassign', auto_process)
-    success &= save_key('distributed_download.process_text', process_text)
-    success &= save_key('distributed_download.process_audio', process_audio)
+    try:
+        update_keys({f'distributed_download.{k}': v for k, v in config.items()})
+        success = True
+    except Exception:
+        success = False
     
     if success:
         logger.info("Successfully saved auto process configuration")
@@ -0,0 +1,158 @@
+import os, sys, json
+import atexit
+import hashlib
+import queue
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOG_FOLDER = 'output/gpt_log'
+CACHE_FILE = os.path.join(LOG_FOLDER, 'response_cache.jsonl')
+
+def make_cache_key(model, prompt, response_format):
+    """Content address of an LLM request: sha256 over (model, prompt, response_format)"""
+    payload = json.dumps([model, prompt, response_format], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """Append-only JSONL response cache with an in-memory hash index
+
+    Each line is {"key": ..., "response": ...}. Lookups are a dict get plus an
+    os.stat to notice the file being moved away (onekeycleanup) or appended to
+    by another process; only then is the index rebuilt or extended from the
+    last indexed offset. Writes append a single line and advance the offset past
+    it, so a lookup after our own write doesn't re-read the file.
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self._index = {}
+        self._file_id = None  # (st_dev, st_ino) of the indexed file
+        self._offset = 0      # bytes of the file already indexed
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path)
+        except OSError:
+            return None
+
+    def _is_current(self, st):
+        if st is None:
+            return self._file_id is None
+        return (st.st_dev, st.st_ino) == self._file_id and st.st_size <= self._offset
+
+    def _refresh(self):
+        st = self._stat()
+        if self._is_current(st):
+            return
+        with self._lock:
+            st = self._stat()
+            if self._is_current(st):
+                return
+            if st is None:
+                self._index, self._file_id, self._offset = {}, None, 0
+                return
+            file_id = (st.st_dev, st.st_ino)
+            if file_id != self._file_id:
+                index, offset = {}, 0
+            else:
+                # 同一文件只追加了新行, 原地扩展索引而不是复制
+                index, offset = self._index, self._offset
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                tail = f.read()
+            # 只处理完整的行, 另一个写入者可能正写到一半
+            end = tail.rfind(b'\n') + 1
+            for line in tail[:end].splitlines():
+                try:
+                    item = json.loads(line)
+                    index[item['key']] = item['response']
+                except (ValueError, KeyError, TypeError):
+                    continue
+            self._index, self._file_id, self._offset = index, file_id, offset + end
+
+    def get(self, key):
+        """Return the cached response for key, or None"""
+        self._refresh()
+        return self._index.get(key)
+
+    def put(self, key, response):
+        line = (json.dumps({"key": key, "response": response}, ensure_ascii=False) + '\n').encode('utf-8')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                f.write(line)
+                f.flush()
+                st = os.fstat(f.fileno())
+            self._index[key] = response
+            indexed = self._offset if (st.st_dev, st.st_ino) == self._file_id else 0 if self._file_id is None else None
+            # 文件只多了我们这一行时直接前移偏移量; 否则留给 _refresh 读取其他写入者的行
+            if indexed is not None and st.st_size == indexed + len(line):
+                self._file_id, self._offset = (st.st_dev, st.st_ino), st.st_size
+
+_response_cache = ResponseCache()
+
+def get_cached_response(model, prompt, response_format):
+    return _response_cache.get(make_cache_key(model, prompt, response_format))
+
+def cache_response(model, prompt, response_format, response):
+    _response_cache.put(make_cache_key(model, prompt, response_format), response)
+
+# ------------
+# Human-readable debug logs, written off the request path
+# ------------
+
+_log_queue = queue.Queue()
+_log_thread = None
+_log_thread_lock = threading.Lock()
+
+def _append_to_json_array(log_file, entry):
+    """Append entry to a JSON array file in place, without re-reading the whole file"""
+    text = json.dumps(entry, ensure_ascii=False, indent=4)
+    text = '\n'.join('    ' + line for line in text.split('\n'))
+    if not os.path.exists(log_file) or os.path.getsize(log_file) == 0:
+        with open(log_file, 'w', encoding='utf-8') as f:
+            f.write('[\n' + text + '\n]')
+        return
+    with open(log_file, 'r+b') as f:
+        f.seek(0, os.SEEK_END)
+        start = max(0, f.tell() - 16)
+        f.seek(start)
+        tail = f.read()
+        # 覆盖结尾的 ']' 写入新条目, 文件始终保持为合法的 JSON 数组
+        close_pos = tail.rfind(b']')
+        if close_pos == -1:
+            raise ValueError(f"{log_file} is not a JSON array")
+        body = tail[:close_pos].rstrip()
+        separator = b'\n' if body.endswith(b'[') else b',\n'
+        f.seek(start + len(body))
+        f.write(separator + text.encode('utf-8') + b'\n]')
+        f.truncate()
+
+def _log_worker():
+    while True:
+        log_file, entry = _log_queue.get()
+        try:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            _append_to_json_array(log_file, entry)
+        except Exception as e:
+            print(f"❎ Failed to write gpt log {log_file}: {e}")
+        finally:
+            _log_queue.task_done()
+
+def write_log_async(log_title, entry):
+    """Queue entry for output/gpt_log/<log_title>.json, written by a background thread"""
+    global _log_thread
+    if _log_thread is None:
+        with _log_thread_lock:
+            if _log_thread is None:
+                _log_thread = threading.Thread(target=_log_worker, name='gpt-log-writer', daemon=True)
+                _log_thread.start()
+    _log_queue.put((os.path.join(LOG_FOLDER, f"{log_title}.json"), entry))
+
+def flush_logs():
+    """Block until every queued debug log has been written"""
+    if _log_thread is not None:
+        _log_queue.join()
+
+atexit.register(flush_logs)
@@ -0,0 +1,112 @@
+import os, sys, json
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.retry_policy import BAD_OUTPUT
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+console = Console()
+
+METRICS_FILE = 'output/gpt_log/llm_metrics.json'
+
+_FIELDS = ('calls', 'cache_hits', 'failures', 'retries', 'validation_failures',
+           'prompt_tokens', 'completion_tokens', 'latency_total', 'latency_max')
+
+_stats = {}
+_lock = threading.Lock()
+
+def _new_stat():
+    return dict.fromkeys(_FIELDS, 0)
+
+def _update(log_title, **deltas):
+    with _lock:
+        stat = _stats.setdefault(log_title or 'default', _new_stat())
+        for field, value in deltas.items():
+            if field == 'latency_max':
+                stat[field] = max(stat[field], value)
+            else:
+                stat[field] += value
+
+class LLMCall:
+    """Telemetry for a single ask_gpt call, tagged by log_title
+
+        call = LLMCall('translate_faithfulness')
+        ...
+        call.add_usage(response.usage)
+        call.finish(retry)
+    """
+
+    def __init__(self, log_title):
+        self.log_title = log_title
+        self.started = time.perf_counter()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add_usage(self, usage):
+        """Accumulate response.usage; called once per attempt, so retried attempts count too"""
+        if usage is None:
+            return
+        self.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+        self.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+
+    def cache_hit(self):
+        _update(self.log_title, calls=1, cache_hits=1)
+
+    def finish(self, retry=None, failed=False):
+        """Record the call; retry is the call's RetryState, whose bad-output count is the number of validation failures"""
+        latency = time.perf_counter() - self.started
+        _update(self.log_title, calls=1, failures=int(failed),
+                retries=retry.retries if retry else 0,
+                validation_failures=retry.attempts[BAD_OUTPUT] if retry else 0,
+                prompt_tokens=self.prompt_tokens, completion_tokens=self.completion_tokens,
+                latency_total=latency, latency_max=latency)
+
+def get_report():
+    """Aggregate per log_title plus a 'total' row; latency in seconds"""
+    with _lock:
+        stats = {title: dict(stat) for title, stat in _stats.items()}
+    total = _new_stat()
+    for stat in stats.values():
+        for field in _FIELDS:
+            total[field] = max(total[field], stat[field]) if field == 'latency_max' else total[field] + stat[field]
+    report = {}
+    for title, stat in list(stats.items()) + [('total', total)]:
+        requests = stat['calls'] - stat['cache_hits']
+        stat['latency_avg'] = round(stat['latency_total'] / requests, 3) if requests else 0
+        stat['latency_total'] = round(stat['latency_total'], 3)
+        stat['latency_max'] = round(stat['latency_max'], 3)
+        report[title] = stat
+    return report
+
+def print_report(report=None):
+    report = report or get_report()
+    if len(report) <= 1:
+        return
+    table = Table(title="LLM usage", box=box.ROUNDED)
+    for column in ("log_title", "calls", "cache hits", "retries", "invalid", "failed", "prompt tok", "completion tok", "avg s", "max s", "total s"):
+        table.add_column(column, justify="left" if column == "log_title" else "right")
+    for title, stat in report.items():
+        table.add_row(title, str(stat['calls']), str(stat['cache_hits']), str(stat['retries']),
+                      str(stat['validation_failures']), str(stat['failures']),
+                      str(stat['prompt_tokens']), str(stat['completion_tokens']),
+                      f"{stat['latency_avg']:.2f}", f"{stat['latency_max']:.2f}", f"{stat['latency_total']:.1f}",
+                      style="bold" if title == 'total' else None)
+    console.print(table)
+
+def dump_report(path=METRICS_FILE):
+    """Print the job's report, write it to path and start a fresh one"""
+    report = get_report()
+    if len(report) <= 1:
+        return None
+    print_report(report)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    reset()
+    return report
+
+def reset():
+    with _lock:
+        _stats.clear()
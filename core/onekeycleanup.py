@@ -2,6 +2,8 @@ import os, sys
 import glob
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.step1_ytdlp import find_video_files
+from core.gpt_cache import flush_logs
+from core.llm_metrics import dump_report
 import shutil
 
 def cleanup(history_dir="history"):
@@ -28,7 +30,9 @@ def cleanup(history_dir="history"):
     for file in glob.glob("output/log/*"):
         move_file(file, log_dir)
 
-    # Move gpt_log files
+    # Move gpt_log files, after the job's LLM usage report and pending debug logs are written
+    dump_report()
+    flush_logs()
     for file in glob.glob("output/gpt_log/*"):
         move_file(file, gpt_log_dir)
 
@@ -31,6 +31,39 @@ Split the given subtitle text into {num_parts} parts, each less than {word_limit
 """.strip()
     return split_prompt
 
+def get_batch_split_prompt(items, word_limit = 20):
+    """items: list of (num_parts, sentence), numbered from 1 in the prompt"""
+    language = load_key("whisper.detected_language")
+    given_text = "\n".join(
+        f'<sentence id="{i}" parts="{num_parts}">{sentence}</sentence>'
+        for i, (num_parts, sentence) in enumerate(items, 1)
+    )
+    output_format = ",\n".join(f'    "{i}": {{"split": "Complete sentence {i} with [br] tags at split positions"}}' for i in range(1, len(items) + 1))
+    split_prompt = f"""
+## Role
+You are a professional Netflix subtitle splitter in {language}.
+
+## Task
+Split each of the given subtitle sentences independently into the number of parts given by its `parts` attribute, each part less than {word_limit} words.
+
+1. Maintain sentence meaning coherence according to Netflix subtitle standards
+2. Keep parts roughly equal in length (minimum 3 words each)
+3. Split at natural points like punctuation marks or conjunctions
+4. If provided text is repeated words, simply split at the middle of the repeated words.
+5. Never change, merge or reorder the words of a sentence, only insert [br] tags
+
+## Output in only JSON format, one entry per sentence id
+{{
+{output_format}
+}}
+
+## Given Text
+<split_these_sentences>
+{given_text}
+</split_these_sentences>
+""".strip()
+    return split_prompt
+
 
 ## ================================================================
 # @ step4_1_summarize.py
@@ -105,7 +138,11 @@ Steps:
 
 ## ================================================================
 # @ step5_translate.py & translate_lines.py
-def generate_shared_prompt(previous_content_prompt, after_content_prompt, summary_prompt, things_to_note_prompt):
+def generate_shared_prompt(previous_content_prompt, after_content_prompt, summary_prompt, things_to_note_prompt, translation_memory_prompt=None):
+    memory_section = f'''
+
+### Translation Memory
+{translation_memory_prompt}''' if translation_memory_prompt else ''
     return f'''### Context Information
 <previous_content>
 {previous_content_prompt}
@@ -119,7 +156,7 @@ def generate_shared_prompt(previous_content_prompt, after_content_prompt, summar
 {summary_prompt}
 
 ### Points to Note
-{things_to_note_prompt}'''
+{things_to_note_prompt}{memory_section}'''
 
 def get_prompt_faithfulness(lines, shared_prompt):
     TARGET_LANGUAGE = load_key("target_language")
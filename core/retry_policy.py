@@ -0,0 +1,157 @@
+import os, sys
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import httpx
+import openai
+from requests.exceptions import RequestException
+
+RATE_LIMIT = 'rate_limit'
+TRANSIENT = 'transient'
+BAD_OUTPUT = 'bad_output'
+FATAL = 'fatal'
+
+# Attempts allowed per error kind before giving up
+MAX_ATTEMPTS = {RATE_LIMIT: 8, TRANSIENT: 5, BAD_OUTPUT: 3, FATAL: 1}
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+def classify_error(e):
+    """Sort an exception from a completion call into rate_limit / transient / bad_output / fatal"""
+    if isinstance(e, openai.RateLimitError):
+        return RATE_LIMIT
+    if isinstance(e, (openai.APIConnectionError, openai.InternalServerError)):  # APITimeoutError is an APIConnectionError
+        return TRANSIENT
+    if isinstance(e, openai.APIStatusError):
+        if e.status_code == 429:
+            return RATE_LIMIT
+        if e.status_code >= 500 or e.status_code in (408, 409):
+            return TRANSIENT
+        # 400/401/403/404 etc. won't get better by retrying
+        return FATAL
+    if isinstance(e, (httpx.TransportError, RequestException, ConnectionError, TimeoutError)):
+        return TRANSIENT
+    if isinstance(e, (ValueError, KeyError, TypeError, AttributeError, IndexError)):
+        # json_repair / valid_def failures and malformed completions
+        return BAD_OUTPUT
+    return TRANSIENT
+
+def retry_after_seconds(e):
+    """Seconds the provider asked us to wait (Retry-After / retry-after-ms), or None"""
+    response = getattr(e, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return max(float(retry_after_ms) / 1000, 0)
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+class CircuitBreaker:
+    """Per-endpoint breaker shared by every thread and coroutine calling that endpoint
+
+    Opens after `failure_threshold` consecutive rate-limit/transient failures and keeps
+    callers waiting for `cooldown` seconds; a Retry-After from any caller pauses all of
+    them, so pool workers stop hammering a throttled provider in lockstep.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def wait_time(self):
+        """Seconds to wait before the next request to this endpoint may start"""
+        return max(self._blocked_until - time.monotonic(), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self, retry_after=None):
+        with self._lock:
+            self._failures += 1
+            now = time.monotonic()
+            if retry_after is not None:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            if self._failures >= self.failure_threshold:
+                self._blocked_until = max(self._blocked_until, now + self.cooldown)
+                self._failures = 0
+                print(f"⚠️ Too many consecutive LLM failures, pausing requests for {self.cooldown:.0f}s")
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+def get_breaker(endpoint):
+    breaker = _BREAKERS.get(endpoint)
+    if breaker is None:
+        with _BREAKERS_LOCK:
+            breaker = _BREAKERS.setdefault(endpoint, CircuitBreaker())
+    return breaker
+
+class RetryState:
+    """Retry bookkeeping for one ask_gpt call
+
+    Usage (sync; the async path awaits asyncio.sleep instead)::
+
+        state = RetryState(base_url)
+        while True:
+            time.sleep(state.wait_before_attempt())
+            try:
+                response = ...
+                state.on_response()
+                ...
+                break
+            except Exception as e:
+                time.sleep(state.on_error(e))  # raises once retries are exhausted
+    """
+
+    def __init__(self, endpoint):
+        self.breaker = get_breaker(endpoint)
+        self.attempts = {kind: 0 for kind in MAX_ATTEMPTS}
+        self.retries = 0
+
+    def wait_before_attempt(self):
+        return self.breaker.wait_time()
+
+    def on_response(self):
+        """The HTTP call itself succeeded (the output may still fail validation)"""
+        self.breaker.record_success()
+
+    def on_error(self, e):
+        """Return the delay before the next attempt, or raise if e shouldn't be retried"""
+        kind = classify_error(e)
+        self.attempts[kind] += 1
+        retry_after = retry_after_seconds(e) if kind == RATE_LIMIT else None
+        if kind in (RATE_LIMIT, TRANSIENT):
+            self.breaker.record_failure(retry_after)
+
+        total = sum(self.attempts.values())
+        if self.attempts[kind] >= MAX_ATTEMPTS[kind]:
+            raise Exception(f"Still failed after {total} attempts ({kind}): {e}\n Please check your network connection or API key or `output/gpt_log/error.json` to debug.") from e
+
+        # Exponential backoff with full jitter; a provider Retry-After is a lower bound
+        delay = random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** (self.attempts[kind] - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        delay = max(delay, self.breaker.wait_time())
+        self.retries += 1
+        print(f"⚠️ LLM {kind.replace('_', ' ')} error: {e}. Retrying in {delay:.1f}s ({self.attempts[kind]}/{MAX_ATTEMPTS[kind]})...")
+        return delay
@@ -1,4 +1,5 @@
 import os,sys
+import threading
 import spacy
 from spacy.cli import download
 from rich import print
@@ -7,25 +8,48 @@ from core.config_utils import load_key
 
 SPACY_MODEL_MAP = load_key("spacy_model_map")
 
+# Segmentation only reads tokens, POS, dependencies and sentence boundaries
+UNUSED_COMPONENTS = ["ner", "lemmatizer", "trainable_lemmatizer", "entity_linker", "entity_ruler", "textcat", "textcat_multilabel"]
+# Everything but the tokenizer, for stages that only count tokens
+PIPELINE_COMPONENTS = ["tok2vec", "transformer", "tagger", "morphologizer", "parser", "senter", "attribute_ruler"] + UNUSED_COMPONENTS
+
+_models = {}  # (model, tokenizer_only) -> nlp, shared by every stage and batch task in the process
+_models_lock = threading.Lock()
+
 def get_spacy_model(language: str):
     model = SPACY_MODEL_MAP.get(language.lower(), "en_core_web_md")
     if language not in SPACY_MODEL_MAP:
         print(f"[yellow]Spacy model does not support '{language}', using en_core_web_md model as fallback...[/yellow]")
     return model
 
-def init_nlp():
+def _load_model(model, exclude):
+    print(f"[blue]⏳ Loading NLP Spacy model: <{model}> ...[/blue]")
+    try:
+        nlp = spacy.load(model, exclude=exclude)
+    except:
+        print(f"[yellow]Downloading {model} model...[/yellow]")
+        print("[yellow]If download failed, please check your network and try again.[/yellow]")
+        download(model)
+        nlp = spacy.load(model, exclude=exclude)
+    print(f"[green]✅ NLP Spacy model loaded successfully![/green]")
+    return nlp
+
+def init_nlp(tokenizer_only=False):
+    """The spaCy model for the current language, loaded once per process without the components no stage uses
+
+    With tokenizer_only none of the pipeline components are loaded, unless the full model
+    is already resident, in which case that one is returned.
+    """
     try:
         language = "en" if load_key("whisper.language") == "en" else load_key("whisper.detected_language")
         model = get_spacy_model(language)
-        print(f"[blue]⏳ Loading NLP Spacy model: <{model}> ...[/blue]")
-        try:
-            nlp = spacy.load(model)
-        except:
-            print(f"[yellow]Downloading {model} model...[/yellow]")
-            print("[yellow]If download failed, please check your network and try again.[/yellow]")
-            download(model)
-            nlp = spacy.load(model)
+        with _models_lock:
+            nlp = _models.get((model, False))
+            if nlp is None and tokenizer_only:
+                nlp = _models.get((model, True))
+            if nlp is None:
+                nlp = _load_model(model, PIPELINE_COMPONENTS if tokenizer_only else UNUSED_COMPONENTS)
+                _models[(model, tokenizer_only)] = nlp
     except:
         raise ValueError(f"❌ Failed to load NLP Spacy model: {model}")
-    print(f"[green]✅ NLP Spacy model loaded successfully![/green]")
-    return nlp
\ No newline at end of file
+    return nlp
@@ -1,10 +1,22 @@
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 import os,sys
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from load_nlp_model import init_nlp
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from core.spacy_utils.load_nlp_model import init_nlp
 from rich import print
 
+# lang -> (connectors, mark_dep, det_pron_deps, verb_pos, noun_pos)
+CONNECTOR_RULES = {
+    "en": (["that", "which", "where", "when", "because", "but", "and", "or"], "mark", ["det", "pron"], "VERB", ["NOUN", "PROPN"]),
+    "zh": (["因为", "所以", "但是", "而且", "虽然", "如果", "即使", "尽管"], "mark", ["det", "pron"], "VERB", ["NOUN", "PROPN"]),
+    "ja": (["けれども", "しかし", "だから", "それで", "ので", "のに", "ため"], "mark", ["case"], "VERB", ["NOUN", "PROPN"]),
+    "fr": (["que", "qui", "où", "quand", "parce que", "mais", "et", "ou"], "mark", ["det", "pron"], "VERB", ["NOUN", "PROPN"]),
+    "ru": (["что", "который", "где", "когда", "потому что", "но", "и", "или"], "mark", ["det"], "VERB", ["NOUN", "PROPN"]),
+    "es": (["que", "cual", "donde", "cuando", "porque", "pero", "y", "o"], "mark", ["det", "pron"], "VERB", ["NOUN", "PROPN"]),
+    "de": (["dass", "welche", "wo", "wann", "weil", "aber", "und", "oder"], "mark", ["det", "pron"], "VERB", ["NOUN", "PROPN"]),
+    "it": (["che", "quale", "dove", "quando", "perché", "ma", "e", "o"], "mark", ["det", "pron"], "VERB", ["NOUN", "PROPN"]),
+}
+
 def analyze_connectors(doc, token):
     """
     Analyze whether a token is a connector that should trigger a sentence split.
@@ -17,56 +29,9 @@ def analyze_connectors(doc, token):
      5. For coordinating conjunctions, check if they connect two independent clauses.
     """
     lang = doc.lang_
-    if lang == "en":
-        connectors = ["that", "which", "where", "when", "because", "but", "and", "or"]
-        mark_dep = "mark"
-        det_pron_deps = ["det", "pron"]
-        verb_pos = "VERB"
-        noun_pos = ["NOUN", "PROPN"]
-    elif lang == "zh":
-        connectors = ["因为", "所以", "但是", "而且", "虽然", "如果", "即使", "尽管"]
-        mark_dep = "mark"
-        det_pron_deps = ["det", "pron"]
-        verb_pos = "VERB"
-        noun_pos = ["NOUN", "PROPN"]
-    elif lang == "ja":
-        connectors = ["けれども", "しかし", "だから", "それで", "ので", "のに", "ため"]
-        mark_dep = "mark"
-        det_pron_deps = ["case"]
-        verb_pos = "VERB"
-        noun_pos = ["NOUN", "PROPN"]
-    elif lang == "fr":
-        connectors = ["que", "qui", "où", "quand", "parce que", "mais", "et", "ou"]
-        mark_dep = "mark"
-        det_pron_deps = ["det", "pron"]
-        verb_pos = "VERB"
-        noun_pos = ["NOUN", "PROPN"]
-    elif lang == "ru":
-        connectors = ["что", "который", "где", "когда", "потому что", "но", "и", "или"] 
-        mark_dep = "mark"
-        det_pron_deps = ["det"]
-        verb_pos = "VERB"
-        noun_pos = ["NOUN", "PROPN"]
-    elif lang == "es":
-        connectors = ["que", "cual", "donde", "cuando", "porque", "pero", "y", "o"]
-        mark_dep = "mark"
-        det_pron_deps = ["det", "pron"]
-        verb_pos = "VERB"
-        noun_pos = ["NOUN", "PROPN"]
-    elif lang == "de":
-        connectors = ["dass", "welche", "wo", "wann", "weil", "aber", "und", "oder"]
-        mark_dep = "mark"
-        det_pron_deps = ["det", "pron"]
-        verb_pos = "VERB"
-        noun_pos = ["NOUN", "PROPN"]
-    elif lang == "it":
-        connectors = ["che", "quale", "dove", "quando", "perché", "ma", "e", "o"]
-        mark_dep = "mark"
-        det_pron_deps = ["det", "pron"]
-        verb_pos = "VERB"
-        noun_pos = ["NOUN", "PROPN"]
-    else:
+    if lang not in CONNECTOR_RULES:
         return False, False
+    connectors, mark_dep, det_pron_deps, verb_pos, noun_pos = CONNECTOR_RULES[lang]
     
     if token.text.lower() not in connectors:
         return False, False
@@ -81,76 +46,35 @@ def analyze_connectors(doc, token):
     else:
         return True, False
 
-def split_by_connectors(text, context_words=5, nlp=None):
-    doc = nlp(text)
-    sentences = [doc.text]  # init
+def split_by_connectors(span, context_words=5):
+    """Split a sentence span before every connector that has context_words words on both sides, in one pass
     
-    while True:
-        # Handle each task with a single cut
-        # avoiding the fragmentation of a sentence into multiple parts at the same time.
-        split_occurred = False
-        new_sentences = []
-        
-        for sent in sentences:
-            doc = nlp(sent)
-            start = 0
-            
-            for i, token in enumerate(doc):
-                split_before, _ = analyze_connectors(doc, token)
-                
-                if i + 1 < len(doc) and doc[i + 1].text in ["'s", "'re", "'ve", "'ll", "'d"]:
-                    continue
-                
-                left_words = doc[max(0, token.i - context_words):token.i]
-                right_words = doc[token.i+1:min(len(doc), token.i + context_words + 1)]
-                
-                left_words = [word.text for word in left_words if not word.is_punct]
-                right_words = [word.text for word in right_words if not word.is_punct]
-                
-                if len(left_words) >= context_words and len(right_words) >= context_words and split_before:
-                    print(f"[yellow]✂️  Split before '{token.text}': {' '.join(left_words)}| {token.text} {' '.join(right_words)}[/yellow]")
-                    new_sentences.append(doc[start:token.i].text.strip())
-                    start = token.i
-                    split_occurred = True
-                    break
-            
-            if start < len(doc):
-                new_sentences.append(doc[start:].text.strip())
+    Each cut starts a new part, so the left context of the next connector only counts
+    words after the previous cut. Returns spans of the same doc.
+    """
+    doc = span.doc
+    sentences = []
+    start = span.start
+    
+    for token in span:
+        if token.i + 1 < span.end and doc[token.i + 1].text in ["'s", "'re", "'ve", "'ll", "'d"]:
+            continue
+        split_before, _ = analyze_connectors(doc, token)
+        if not split_before:
+            continue
         
-        if not split_occurred:
-            break
+        left_words = [word.text for word in doc[max(start, token.i - context_words):token.i] if not word.is_punct]
+        right_words = [word.text for word in doc[token.i + 1:min(span.end, token.i + context_words + 1)] if not word.is_punct]
         
-        sentences = new_sentences
+        if len(left_words) >= context_words and len(right_words) >= context_words:
+            print(f"[yellow]✂️  Split before '{token.text}': {' '.join(left_words)}| {token.text} {' '.join(right_words)}[/yellow]")
+            sentences.append(doc[start:token.i])
+            start = token.i
     
+    sentences.append(doc[start:span.end])
     return sentences
 
-def split_sentences_main(nlp):
-    # Read input sentences
-    with open("output/log/sentence_by_comma.txt", "r", encoding="utf-8") as input_file:
-        sentences = input_file.readlines()
-    
-    all_split_sentences = []
-    # Process each input sentence
-    for sentence in sentences:
-        split_sentences = split_by_connectors(sentence.strip(), nlp = nlp)
-        all_split_sentences.extend(split_sentences)
-    
-    # output to sentence_splitbyconnector.txt
-    with open("output/log/sentence_splitbyconnector.txt", "w+", encoding="utf-8") as output_file:
-        for sentence in all_split_sentences:
-            output_file.write(sentence + "\n")
-        # do not add a newline at the end of the file
-        output_file.seek(output_file.tell() - 1, os.SEEK_SET)
-        output_file.truncate()
-
-    # delete the original file
-    os.remove("output/log/sentence_by_comma.txt")
-    
-    print("[green]💾 Sentences split by connectors saved to →  `sentence_splitbyconnector.txt`[/green]")
-
 if __name__ == "__main__":
     nlp = init_nlp()
-    split_sentences_main(nlp)
-    # nlp = init_nlp()
-    # a = "and show the specific differences that make a difference between a breakaway that results in a goal in the NHL versus one that doesn't."
-    # print(split_by_connectors(a, nlp))
\ No newline at end of file
+    a = "and show the specific differences that make a difference between a breakaway that results in a goal in the NHL versus one that doesn't."
+    print([sent.text for sent in split_by_connectors(nlp(a)[:])])
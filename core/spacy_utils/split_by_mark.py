@@ -7,7 +7,8 @@ from core.spacy_utils.load_nlp_model import init_nlp
 from core.config_utils import load_key, get_joiner
 from rich import print
 
-def split_by_mark(nlp):
+def parse_transcript(nlp):
+    """Join the cleaned ASR chunks with the language's joiner and parse the whole transcript once"""
     whisper_language = load_key("whisper.language")
     language = load_key("whisper.detected_language") if whisper_language == 'auto' else whisper_language # consider force english case
     joiner = get_joiner(language)
@@ -20,20 +21,21 @@ def split_by_mark(nlp):
 
     doc = nlp(input_text)
     assert doc.has_annotation("SENT_START")
+    return doc
 
-    sentences_by_mark = [sent.text for sent in doc.sents]
-
-    with open("output/log/sentence_by_mark.txt", "w", encoding="utf-8") as output_file:
-        for i, sentence in enumerate(sentences_by_mark):
-            if i > 0 and sentence.strip() in [',', '.', '，', '。', '？', '！']:
-                # ! If the current line contains only punctuation, merge it with the previous line, this happens in Chinese, Japanese, etc.
-                output_file.seek(output_file.tell() - 1, os.SEEK_SET)  # Move to the end of the previous line
-                output_file.write(sentence)  # Add the punctuation
-            else:
-                output_file.write(sentence + "\n")
-    
-    print("[green]💾 Sentences split by punctuation marks saved to →  `sentences_by_mark.txt`[/green]")
+def split_by_mark(doc):
+    """Sentence spans of doc split at punctuation marks"""
+    sentences_by_mark = []
+    for sent in doc.sents:
+        if sentences_by_mark and sent.text.strip() in [',', '.', '，', '。', '？', '！']:
+            # ! If the current sentence contains only punctuation, merge it with the previous one, this happens in Chinese, Japanese, etc.
+            sentences_by_mark[-1] = doc[sentences_by_mark[-1].start:sent.end]
+        else:
+            sentences_by_mark.append(sent)
+    print(f"[green]✂️  {len(sentences_by_mark)} sentences split by punctuation marks[/green]")
+    return sentences_by_mark
 
 if __name__ == "__main__":
     nlp = init_nlp()
-    split_by_mark(nlp)
+    for sent in split_by_mark(parse_transcript(nlp)):
+        print(sent.text)
@@ -13,7 +13,7 @@ from rich.progress import Progress
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.config_utils import load_key
+from core.config_utils import load_key, bind_config_context
 from core.all_whisper_methods.audio_preprocess import get_audio_duration
 from core.all_tts_functions.tts_main import tts_main
 
@@ -105,7 +105,7 @@ def generate_tts_audio(tasks_df: pd.DataFrame) -> pd.DataFrame:
             remaining_tasks = tasks_df.iloc[warmup_size:].copy()
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
                 futures = [
-                    executor.submit(process_row, row, tasks_df.copy())
+                    executor.submit(bind_config_context(process_row), row, tasks_df.copy())
                     for _, row in remaining_tasks.iterrows()
                 ]
                 
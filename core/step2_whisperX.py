@@ -1,13 +1,22 @@
 import os,sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import concurrent.futures
 
 from rich import print as rprint
 
-from core.config_utils import load_key
+from core.config_utils import load_key, bind_config_context
 from core.all_whisper_methods.demucs_vl import demucs_main, RAW_AUDIO_FILE, VOCAL_AUDIO_FILE
 from core.all_whisper_methods.audio_preprocess import process_transcription, convert_video_to_audio, split_audio, save_results, CLEANED_CHUNKS_EXCEL_PATH, normalize_audio_volume
 from core.step1_ytdlp import find_video_files
 
+def transcribe_segments(ts, segments, raw_audio, vocal_audio, max_workers=1):
+    """Transcribe each (start, end) segment with up to max_workers in flight, results in segment order"""
+    if max_workers <= 1 or len(segments) <= 1:
+        return [ts(raw_audio, vocal_audio, start, end) for start, end in segments]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(segments))) as executor:
+        futures = [executor.submit(bind_config_context(ts), raw_audio, vocal_audio, start, end) for start, end in segments]
+        return [future.result() for future in futures]
+
 def transcribe():
     if os.path.exists(CLEANED_CHUNKS_EXCEL_PATH):
         rprint("[yellow]⚠️ Transcription results already exist, skipping transcription step.[/yellow]")
@@ -28,7 +37,6 @@ def transcribe():
     segments = split_audio(RAW_AUDIO_FILE)
     
     # step3 Transcribe audio
-    all_results = []
     runtime = load_key("whisper.runtime")
     if runtime == "local":
         from core.all_whisper_methods.whisperX_local import transcribe_audio as ts
@@ -40,9 +48,9 @@ def transcribe():
         from core.all_whisper_methods.elevenlabs_transcribe import transcribe_audio_elevenlabs as ts
         rprint("[cyan]🎤 Transcribing audio with ElevenLabs API...[/cyan]")
 
-    for start, end in segments:
-        result = ts(RAW_AUDIO_FILE, vocal_audio, start, end)
-        all_results.append(result)
+    # Remote APIs upload each segment independently, the local model runs one segment at a time
+    max_workers = 1 if runtime == "local" else load_key("whisper.max_concurrent_segments", 4)
+    all_results = transcribe_segments(ts, segments, RAW_AUDIO_FILE, vocal_audio, max_workers)
     
     # step4 Combine results
     combined_result = {'segments': []}
@@ -1,24 +1,49 @@
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import string
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from spacy_utils.split_by_comma import split_by_comma_main
-from spacy_utils.split_by_connector import split_sentences_main
-from spacy_utils.split_by_mark import split_by_mark
-from spacy_utils.split_long_by_root import split_long_by_root_main
-from spacy_utils.load_nlp_model import init_nlp
+from core.spacy_utils.split_by_comma import split_by_comma
+from core.spacy_utils.split_by_connector import split_by_connectors
+from core.spacy_utils.split_by_mark import parse_transcript, split_by_mark
+from core.spacy_utils.split_long_by_root import split_long_by_root
+from core.spacy_utils.load_nlp_model import init_nlp
+from rich import print
+
+SENTENCE_SPLITBYNLP_FILE = 'output/log/sentence_splitbynlp.txt'
+
+def segment(nlp):
+    """Run the mark -> comma -> connector -> root rules over spans of a single parse of the transcript"""
+    doc = parse_transcript(nlp)
+    spans = [part for sent in split_by_mark(doc) for part in split_by_comma(sent)]
+    spans = [part for span in spans for part in split_by_connectors(span)]
+    return split_long_by_root(spans)
+
+def save_sentences(sentences):
+    punctuation = string.punctuation + "'" + '"'  # include all punctuation and apostrophe ' and "
+    lines = []
+    for i, sentence in enumerate(sentences):
+        stripped_sentence = sentence.strip()
+        if not stripped_sentence or all(char in punctuation for char in stripped_sentence):
+            print(f"[yellow]⚠️  Warning: Empty or punctuation-only line detected at index {i}[/yellow]")
+            if lines:
+                lines[-1] += stripped_sentence
+            continue
+        lines.append(sentence)
+
+    with open(SENTENCE_SPLITBYNLP_FILE, "w", encoding="utf-8") as output_file:
+        for sentence in lines:
+            output_file.write(sentence + "\n")
+    print("[green]💾 Sentences split by nlp saved to →  `sentence_splitbynlp.txt`[/green]")
 
 def split_by_spacy():
-    if os.path.exists('output/log/sentence_splitbynlp.txt'):
+    if os.path.exists(SENTENCE_SPLITBYNLP_FILE):
         print("File 'sentence_splitbynlp.txt' already exists. Skipping split_by_spacy.")
         return
     
     nlp = init_nlp()
-    split_by_mark(nlp)
-    split_by_comma_main(nlp)
-    split_sentences_main(nlp)
-    split_long_by_root_main(nlp)
+    save_sentences(segment(nlp))
     return
 
 if __name__ == '__main__':
-    split_by_spacy()
\ No newline at end of file
+    split_by_spacy()
@@ -1,66 +1,111 @@
 import sys,os,math
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import collections
 import concurrent.futures
-from core.ask_gpt import ask_gpt
-from core.prompts_storage import get_split_prompt
+import threading
+from core.ask_gpt import ask_gpt, ask_gpt_async, aclose_async_clients
+from core.prompts_storage import get_split_prompt, get_batch_split_prompt
 from difflib import SequenceMatcher
-import math
 from core.spacy_utils.load_nlp_model import init_nlp
-from core.config_utils import load_key, get_joiner
+from core.config_utils import load_key, bind_config_context
 from rich.console import Console
 from rich.table import Table
 
 console = Console()
 
-def tokenize_sentence(sentence, nlp):
-    # tokenizer counts the number of words in the sentence
-    doc = nlp(sentence)
-    return [token.text for token in doc]
+SPLIT_ROUNDS = 3
+
+class TokenCounter:
+    """Token counts from the bare spaCy tokenizer, computed in batches and cached across split passes
+    
+    Only the tokenizer decides the token count, so the rest of the pipeline is skipped, and
+    pieces already counted in an earlier pass are not tokenized again. Safe to share between threads.
+    """
+
+    def __init__(self, nlp, batch_size=256):
+        self.tokenizer = nlp.tokenizer
+        self.batch_size = batch_size
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def count(self, sentences):
+        with self._lock:
+            missing = list(dict.fromkeys(sentence for sentence in sentences if sentence not in self._counts))
+            if missing:
+                # custom tokenizers (e.g. zh/ja) may not implement pipe
+                docs = self.tokenizer.pipe(missing, batch_size=self.batch_size) if hasattr(self.tokenizer, 'pipe') else map(self.tokenizer, missing)
+                for sentence, doc in zip(missing, docs):
+                    self._counts[sentence] = len(doc)
+            return [self._counts[sentence] for sentence in sentences]
+
+def _strip_with_offsets(text):
+    """text lowercased without whitespace, plus the index in text of each kept character"""
+    chars, offsets = [], []
+    for i, ch in enumerate(text):
+        if not ch.isspace():
+            chars.append(ch.lower())
+            offsets.append(i)
+    return ''.join(chars), offsets
+
+def _map_position(opcodes, b):
+    """Map a position in the modified string to the original one through an alignment's opcodes"""
+    for tag, i1, i2, j1, j2 in opcodes:
+        if j1 <= b <= j2:
+            if tag == 'equal':
+                return i1 + b - j1
+            if j2 > j1:
+                return i1 + round((b - j1) * (i2 - i1) / (j2 - j1))
+    return opcodes[-1][2] if opcodes else 0
 
 def find_split_positions(original, modified):
+    """Map the [br] markers of modified back to character offsets in original
+    
+    Both texts are compared without whitespace, so the joiner doesn't matter. If the
+    model kept the text intact the boundaries carry over directly; otherwise a single
+    alignment of the two strings maps them.
+    """
     split_positions = []
     parts = modified.split('[br]')
-    start = 0
-    whisper_language = load_key("whisper.language")
-    language = load_key("whisper.detected_language") if whisper_language == 'auto' else whisper_language
-    joiner = get_joiner(language)
+    orig_norm, orig_offsets = _strip_with_offsets(original)
+    part_norms = [_strip_with_offsets(part)[0] for part in parts]
+    mod_norm = ''.join(part_norms)
 
-    for i in range(len(parts) - 1):
-        max_similarity = 0
-        best_split = None
+    boundaries, pos = [], 0
+    for part_norm in part_norms[:-1]:
+        pos += len(part_norm)
+        boundaries.append(pos)
 
-        for j in range(start, len(original)):
-            original_left = original[start:j]
-            modified_left = joiner.join(parts[i].split())
+    if mod_norm != orig_norm:
+        matcher = SequenceMatcher(None, orig_norm, mod_norm, autojunk=False)
+        similarity = matcher.ratio()
+        if similarity < 0.9:
+            console.print(f"[yellow]Warning: low similarity found at the best split point: {similarity}[/yellow]")
+        opcodes = matcher.get_opcodes()
+        boundaries = [_map_position(opcodes, b) for b in boundaries]
 
-            left_similarity = SequenceMatcher(None, original_left, modified_left).ratio()
-
-            if left_similarity > max_similarity:
-                max_similarity = left_similarity
-                best_split = j
-
-        if max_similarity < 0.9:
-            console.print(f"[yellow]Warning: low similarity found at the best split point: {max_similarity}[/yellow]")
-        if best_split is not None:
-            split_positions.append(best_split)
-            start = best_split
-        else:
+    start = 0
+    for i, b in enumerate(boundaries):
+        if not orig_offsets:
             console.print(f"[yellow]Warning: Unable to find a suitable split point for the {i+1}th part.[/yellow]")
+            continue
+        # split right after the last character of the left part
+        split_point = orig_offsets[b - 1] + 1 if b > 0 else 0
+        split_point = max(split_point, start)
+        split_positions.append(split_point)
+        start = split_point
 
     return split_positions
 
-def split_sentence(sentence, num_parts, word_limit=18, index=-1, retry_attempt=0):
-    """Split a long sentence using GPT and return the result as a string."""
-    split_prompt = get_split_prompt(sentence, num_parts, word_limit)
-    def valid_split(response_data):
-        if 'split' not in response_data:
-            return {"status": "error", "message": "Missing required key: `split`"}
-        if "[br]" not in response_data["split"]:
-            return {"status": "error", "message": "Split failed, no [br] found"}
-        return {"status": "success", "message": "Split completed"}
-    
-    response_data = ask_gpt(split_prompt + ' ' * retry_attempt, response_json=True, valid_def=valid_split, log_title='sentence_splitbymeaning')
-    best_split = response_data["split"]
+def valid_split(response_data):
+    if 'split' not in response_data:
+        return {"status": "error", "message": "Missing required key: `split`"}
+    if "[br]" not in response_data["split"]:
+        return {"status": "error", "message": "Split failed, no [br] found"}
+    return {"status": "success", "message": "Split completed"}
+
+def apply_split(sentence, best_split, index=-1):
+    """Map the LLM's [br]-marked split back onto the original sentence, returning newline-separated parts"""
     split_points = find_split_positions(sentence, best_split)
     # split the sentence based on the split points
     for i, split_point in enumerate(split_points):
@@ -82,32 +127,204 @@ def split_sentence(sentence, num_parts, word_limit=18, index=-1, retry_attempt=0
     
     return best_split
 
-def parallel_split_sentences(sentences, max_length, max_workers, nlp, retry_attempt=0):
-    """Split sentences in parallel using a thread pool."""
+def split_sentence(sentence, num_parts, word_limit=18, index=-1, retry_attempt=0):
+    """Split a long sentence using GPT and return the result as a string."""
+    split_prompt = get_split_prompt(sentence, num_parts, word_limit)
+    response_data = ask_gpt(split_prompt + ' ' * retry_attempt, response_json=True, valid_def=valid_split, log_title='sentence_splitbymeaning')
+    return apply_split(sentence, response_data["split"], index)
+
+async def split_sentence_async(sentence, num_parts, word_limit=18, index=-1, retry_attempt=0):
+    """Coroutine version of split_sentence built on ask_gpt_async."""
+    split_prompt = get_split_prompt(sentence, num_parts, word_limit)
+    response_data = await ask_gpt_async(split_prompt + ' ' * retry_attempt, response_json=True, valid_def=valid_split, log_title='sentence_splitbymeaning')
+    return apply_split(sentence, response_data["split"], index)
+
+# LLM rounds for a batch before the items that still fail fall back to one request each
+BATCH_SPLIT_ROUNDS = 2
+
+def valid_batch_split(response_data):
+    if not isinstance(response_data, dict) or not response_data:
+        return {"status": "error", "message": "Expected a JSON object keyed by sentence id"}
+    return {"status": "success", "message": "Split completed"}
+
+def _normalize_for_check(text):
+    return ''.join(text.replace('[br]', '').split()).lower()
+
+def check_batch_item(sentence, item):
+    """Return the [br]-marked split for one sentence of a batch, or None if it can't be used"""
+    if not isinstance(item, dict) or not isinstance(item.get('split'), str) or '[br]' not in item['split']:
+        return None
+    # the model must not have rewritten or swapped sentences
+    if SequenceMatcher(None, _normalize_for_check(sentence), _normalize_for_check(item['split'])).ratio() < 0.8:
+        return None
+    return item['split']
+
+def _batch_split_prompt(remaining, word_limit, retry_attempt, round_idx):
+    prompt = get_batch_split_prompt([(num_parts, sentence) for _, sentence, num_parts in remaining], word_limit)
+    return prompt + ' ' * (retry_attempt + round_idx)
+
+def _collect_batch_round(remaining, response_data, results):
+    """Apply one batched response; returns the items that still need splitting"""
+    failed = []
+    for i, (index, sentence, num_parts) in enumerate(remaining, 1):
+        best_split = check_batch_item(sentence, response_data.get(str(i)))
+        if best_split is None:
+            failed.append((index, sentence, num_parts))
+        else:
+            results[index] = apply_split(sentence, best_split, index)
+    if failed:
+        console.print(f'[yellow]⚠️ {len(failed)}/{len(remaining)} sentences of a batched split need another try[/yellow]')
+    return failed
+
+def split_sentences_batch(batch, word_limit=18, retry_attempt=0):
+    """Split several (index, sentence, num_parts) items with one LLM call per round, returning {index: split}
+    
+    Only the items that fail validation are re-sent; what's left after BATCH_SPLIT_ROUNDS
+    goes through split_sentence one by one.
+    """
+    results = {}
+    remaining = list(batch)
+    for round_idx in range(BATCH_SPLIT_ROUNDS):
+        if len(remaining) <= 1:
+            break
+        response_data = ask_gpt(_batch_split_prompt(remaining, word_limit, retry_attempt, round_idx), response_json=True, valid_def=valid_batch_split, log_title='sentence_splitbymeaning')
+        remaining = _collect_batch_round(remaining, response_data, results)
+    for index, sentence, num_parts in remaining:
+        results[index] = split_sentence(sentence, num_parts, word_limit, index=index, retry_attempt=retry_attempt)
+    return results
+
+async def split_sentences_batch_async(batch, word_limit=18, retry_attempt=0):
+    """Coroutine version of split_sentences_batch."""
+    results = {}
+    remaining = list(batch)
+    for round_idx in range(BATCH_SPLIT_ROUNDS):
+        if len(remaining) <= 1:
+            break
+        response_data = await ask_gpt_async(_batch_split_prompt(remaining, word_limit, retry_attempt, round_idx), response_json=True, valid_def=valid_batch_split, log_title='sentence_splitbymeaning')
+        remaining = _collect_batch_round(remaining, response_data, results)
+    singles = await asyncio.gather(*(split_sentence_async(sentence, num_parts, word_limit, index=index, retry_attempt=retry_attempt) for index, sentence, num_parts in remaining))
+    results.update({index: result for (index, _, _), result in zip(remaining, singles)})
+    return results
+
+def plan_splits(sentences, max_length, token_counter):
+    """Return (new_sentences, to_split): short sentences are kept as-is, long ones listed as (index, sentence, num_parts)"""
     new_sentences = [None] * len(sentences)
-    futures = []
+    to_split = []
+    for index, (sentence, num_tokens) in enumerate(zip(sentences, token_counter.count(sentences))):
+        if num_tokens > max_length:
+            to_split.append((index, sentence, math.ceil(num_tokens / max_length)))
+        else:
+            new_sentences[index] = [sentence]
+    return new_sentences, to_split
+
+def merge_split_results(new_sentences, sentences, split_results):
+    """Fill new_sentences with the split parts from split_results ({index: split_result}) and flatten"""
+    for index, split_result in split_results.items():
+        if split_result:
+            split_lines = split_result.strip().split('\n')
+            new_sentences[index] = [line.strip() for line in split_lines]
+        else:
+            new_sentences[index] = [sentences[index]]
+    return [sentence for sublist in new_sentences for sentence in sublist]
+
+def _batches(items, batch_size):
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+def parallel_split_sentences(sentences, max_length, max_workers, token_counter, retry_attempt=0):
+    """Split sentences in parallel using a thread pool."""
+    new_sentences, to_split = plan_splits(sentences, max_length, token_counter)
+    batch_size = load_key("split_batch_size", 1)
+    split_results = {}
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for index, sentence in enumerate(sentences):
-            # Use tokenizer to split the sentence
-            tokens = tokenize_sentence(sentence, nlp)
-            # print("Tokenization result:", tokens)
-            num_parts = math.ceil(len(tokens) / max_length)
-            if len(tokens) > max_length:
-                future = executor.submit(split_sentence, sentence, num_parts, max_length, index=index, retry_attempt=retry_attempt)
-                futures.append((future, index, num_parts, sentence))
-            else:
-                new_sentences[index] = [sentence]
-
-        for future, index, num_parts, sentence in futures:
-            split_result = future.result()
-            if split_result:
-                split_lines = split_result.strip().split('\n')
-                new_sentences[index] = [line.strip() for line in split_lines]
-            else:
-                new_sentences[index] = [sentence]
+        if batch_size > 1:
+            futures = [executor.submit(bind_config_context(split_sentences_batch), batch, max_length, retry_attempt) for batch in _batches(to_split, batch_size)]
+            for future in futures:
+                split_results.update(future.result())
+        else:
+            futures = [(index, executor.submit(bind_config_context(split_sentence), sentence, num_parts, max_length, index=index, retry_attempt=retry_attempt)) for index, sentence, num_parts in to_split]
+            for index, future in futures:
+                split_results[index] = future.result()
 
-    return [sentence for sublist in new_sentences for sentence in sublist]
+    return merge_split_results(new_sentences, sentences, split_results)
+
+async def parallel_split_sentences_async(sentences, max_length, token_counter, retry_attempt=0):
+    """Split sentences concurrently on the event loop, bounded by max_concurrent_requests."""
+    new_sentences, to_split = plan_splits(sentences, max_length, token_counter)
+    batch_size = load_key("split_batch_size", 1)
+    split_results = {}
+
+    try:
+        if batch_size > 1:
+            for batch_result in await asyncio.gather(*(split_sentences_batch_async(batch, max_length, retry_attempt) for batch in _batches(to_split, batch_size))):
+                split_results.update(batch_result)
+        else:
+            results = await asyncio.gather(*(split_sentence_async(sentence, num_parts, max_length, index=index, retry_attempt=retry_attempt) for index, sentence, num_parts in to_split))
+            split_results = {index: result for (index, _, _), result in zip(to_split, results)}
+    finally:
+        await aclose_async_clients()
+
+    return merge_split_results(new_sentences, sentences, split_results)
+
+def split_until_fit(items, max_length, token_counter, rounds=SPLIT_ROUNDS):
+    """Run (index, sentence, num_parts) items through up to `rounds` split passes, returning {index: [parts]}
+    
+    Same passes as split_sentences_by_meaning, applied to one group of sentences so that
+    the group is final as soon as its own LLM calls are done.
+    """
+    batch_size = load_key("split_batch_size", 1)
+    pieces = {index: [sentence] for index, sentence, _ in items}
+    todo = [((index, 0), sentence, num_parts) for index, sentence, num_parts in items]
+    for retry_attempt in range(rounds):
+        if not todo:
+            break
+        if batch_size > 1:
+            split_results = {}
+            for batch in _batches(todo, batch_size):
+                split_results.update(split_sentences_batch(batch, max_length, retry_attempt))
+        else:
+            split_results = {key: split_sentence(sentence, num_parts, max_length, index=key[0], retry_attempt=retry_attempt) for key, sentence, num_parts in todo}
+        todo = []
+        for index in pieces:
+            new_pieces = []
+            for pos, piece in enumerate(pieces[index]):
+                split_result = split_results.get((index, pos))
+                new_pieces.extend([line.strip() for line in split_result.strip().split('\n')] if split_result else [piece])
+            pieces[index] = new_pieces
+            for pos, (piece, num_tokens) in enumerate(zip(new_pieces, token_counter.count(new_pieces))):
+                if num_tokens > max_length:
+                    todo.append(((index, pos), piece, math.ceil(num_tokens / max_length)))
+    return pieces
+
+def iter_split_sentences(sentences, max_length, executor, token_counter, lookahead=None):
+    """Yield the split-by-meaning sentences in order, each as soon as it and everything before it is final
+    
+    Long sentences are split in groups of split_batch_size on executor (shared with the
+    caller's other LLM work); short ones pass straight through. Groups are submitted at
+    most `lookahead` (default max_workers) ahead of the sentence being yielded, so work
+    the caller queues on the same executor, such as translating the first chunks, isn't
+    stuck behind the whole split backlog. Starts the LLM calls on the first `next()`.
+    """
+    new_sentences, to_split = plan_splits(sentences, max_length, token_counter)
+    batch_size = max(load_key("split_batch_size", 1), 1)
+    lookahead = max(lookahead or load_key("max_workers"), 1)
+    groups = collections.deque(_batches(to_split, batch_size))
+    pending = collections.deque()  # (last sentence index of a submitted group, future), in sentence order
+
+    def fill():
+        while groups and len(pending) < lookahead:
+            group = groups.popleft()
+            pending.append((group[-1][0], executor.submit(bind_config_context(split_until_fit), group, max_length, token_counter)))
+
+    fill()
+    for index, parts in enumerate(new_sentences):
+        if parts is None:
+            last_index, future = pending[0]
+            parts = future.result()[index]
+            if index == last_index:
+                pending.popleft()
+                fill()
+        yield from parts
 
 def split_sentences_by_meaning():
     """The main function to split sentences by meaning."""
@@ -115,10 +332,13 @@ def split_sentences_by_meaning():
     with open('output/log/sentence_splitbynlp.txt', 'r', encoding='utf-8') as f:
         sentences = [line.strip() for line in f.readlines()]
 
-    nlp = init_nlp()
+    token_counter = TokenCounter(init_nlp(tokenizer_only=True))
     # 🔄 process sentences multiple times to ensure all are split
-    for retry_attempt in range(3):
-        sentences = parallel_split_sentences(sentences, max_length=load_key("max_split_length"), max_workers=load_key("max_workers"), nlp=nlp, retry_attempt=retry_attempt)
+    for retry_attempt in range(SPLIT_ROUNDS):
+        if load_key("llm_async", False):
+            sentences = asyncio.run(parallel_split_sentences_async(sentences, max_length=load_key("max_split_length"), token_counter=token_counter, retry_attempt=retry_attempt))
+        else:
+            sentences = parallel_split_sentences(sentences, max_length=load_key("max_split_length"), max_workers=load_key("max_workers"), token_counter=token_counter, retry_attempt=retry_attempt)
 
     # 💾 save results
     with open('output/log/sentence_splitbymeaning.txt', 'w', encoding='utf-8') as f:
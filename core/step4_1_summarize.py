@@ -1,40 +1,73 @@
 import os, sys, json
+import hashlib
+import threading
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.ask_gpt import ask_gpt
 from core.prompts_storage import get_summary_prompt
 from core.config_utils import load_key
+from core.term_matcher import TermMatcher
 import pandas as pd
 
 TERMINOLOGY_JSON_PATH = 'output/log/terminology.json'
 SENTENCE_TXT_PATH = 'output/log/sentence_splitbymeaning.txt'
 CUSTOM_TERMS_PATH = 'custom_terms.xlsx'
 
-def combine_chunks():
+def combine_chunks(source_path=SENTENCE_TXT_PATH):
     """Combine the text chunks identified by whisper into a single long text"""
-    with open(SENTENCE_TXT_PATH, 'r', encoding='utf-8') as file:
+    with open(source_path, 'r', encoding='utf-8') as file:
         sentences = file.readlines()
     cleaned_sentences = [line.strip() for line in sentences]
     combined_text = ' '.join(cleaned_sentences)
     return combined_text[:load_key('summary_length')]  #! Return only the first x characters
 
+_glossary = None  # (file signature, terms, TermMatcher, digest)
+_glossary_lock = threading.Lock()
+
+def _load_glossary():
+    global _glossary
+    st = os.stat(TERMINOLOGY_JSON_PATH)
+    signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+    glossary = _glossary
+    if glossary is None or glossary[0] != signature:
+        with _glossary_lock:
+            glossary = _glossary
+            if glossary is None or glossary[0] != signature:
+                with open(TERMINOLOGY_JSON_PATH, 'r', encoding='utf-8') as file:
+                    terms = json.load(file).get('terms', [])
+                digest = hashlib.sha1(json.dumps(terms, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+                glossary = _glossary = (signature, terms, TermMatcher(term['src'] for term in terms), digest)
+    return glossary
+
+def get_glossary():
+    """Terms from terminology.json with their compiled matcher, rebuilt only when the file changes"""
+    glossary = _load_glossary()
+    return glossary[1], glossary[2]
+
+def get_glossary_digest():
+    """Short hash of the current terms, '' before terminology.json exists"""
+    if not os.path.exists(TERMINOLOGY_JSON_PATH):
+        return ''
+    return _load_glossary()[3]
+
+def format_terms(terms, ids):
+    """Points-to-note prompt listing terms[i] for each i in ids"""
+    return '\n'.join(
+        f'{i+1}. "{terms[i]["src"]}": "{terms[i]["tgt"]}",'
+        f' meaning: {terms[i]["note"]}'
+        for i in ids
+    )
+
 def search_things_to_note_in_prompt(sentence):
     """Search for terms to note in the given sentence"""
-    with open(TERMINOLOGY_JSON_PATH, 'r', encoding='utf-8') as file:
-        things_to_note = json.load(file)
-    things_to_note_list = [term['src'] for term in things_to_note['terms'] if term['src'].lower() in sentence.lower()]
-    if things_to_note_list:
-        prompt = '\n'.join(
-            f'{i+1}. "{term["src"]}": "{term["tgt"]}",'
-            f' meaning: {term["note"]}'
-            for i, term in enumerate(things_to_note['terms'])
-            if term['src'] in things_to_note_list
-        )
-        return prompt
+    terms, matcher = get_glossary()
+    matched = matcher.find(sentence)
+    if matched:
+        return format_terms(terms, matched)
     else:
         return None
 
-def get_summary():
-    src_content = combine_chunks()
+def get_summary(source_path=SENTENCE_TXT_PATH):
+    src_content = combine_chunks(source_path)
     custom_terms = pd.read_excel(CUSTOM_TERMS_PATH)
     custom_terms_json = {
         "terms": [
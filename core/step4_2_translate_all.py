@@ -1,13 +1,20 @@
-import sys, os
+import sys, os, math
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd
 import json
+import asyncio
+import collections
 import concurrent.futures
-from core.translate_once import translate_lines
-from core.step4_1_summarize import search_things_to_note_in_prompt
+import itertools
+from core.translate_once import translate_lines, translate_lines_async
+from core.ask_gpt import aclose_async_clients
+from core.step3_2_splitbymeaning import iter_split_sentences, TokenCounter
+from core.step4_1_summarize import search_things_to_note_in_prompt, get_summary, get_glossary, format_terms
+from core.prompts_storage import generate_shared_prompt, get_prompt_expressiveness
+from core.spacy_utils.load_nlp_model import init_nlp
 from core.step8_1_gen_audio_task import check_len_then_trim
 from core.step6_generate_final_timeline import align_timestamp
-from core.config_utils import load_key
+from core.config_utils import load_key, bind_config_context
 from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
@@ -16,29 +23,70 @@ from difflib import SequenceMatcher
 console = Console()
 
 SENTENCE_SPLIT_FILE = "output/log/sentence_splitbymeaning.txt"
+SENTENCE_SPLITBYNLP_FILE = "output/log/sentence_splitbynlp.txt"
 TRANSLATION_RESULTS_FILE = "output/log/translation_results.xlsx"
 TERMINOLOGY_FILE = "output/log/terminology.json"
 CLEANED_CHUNKS_FILE = "output/log/cleaned_chunks.xlsx"
 
+# The expressiveness prompt carries each source line three times (input, origin, direct)
+PROMPT_TOKENS_PER_SOURCE_TOKEN = 3
+# The faithfulness/expressiveness JSON repeats each source line with several translations
+RESPONSE_TOKENS_PER_SOURCE_TOKEN = 6
+
+def estimate_tokens(text):
+    """Rough LLM token count: about one token per CJK/kana/hangul character, four characters per token otherwise"""
+    wide = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return wide + math.ceil((len(text) - wide) / 4)
+
+def prompt_overhead_tokens(theme_prompt=None):
+    """Tokens of the expressiveness prompt without any lines: template, theme and every glossary term"""
+    terms = get_glossary()[0] if os.path.exists(TERMINOLOGY_FILE) else []
+    shared_prompt = generate_shared_prompt(None, None, theme_prompt, format_terms(terms, range(len(terms))))
+    return estimate_tokens(get_prompt_expressiveness({}, '', shared_prompt))
+
+def chunk_token_budget(theme_prompt=None):
+    """Source tokens a chunk may hold so the prompt and response fit the model, 0 for no limit
+
+    translate_chunk.max_tokens caps it directly; context_window and max_output_tokens
+    cap it by the model's limits, with the prompt overhead measured on the real prompt.
+    """
+    limits = []
+    max_tokens = load_key("translate_chunk.max_tokens", 0)
+    context_window = load_key("translate_chunk.context_window", 0)
+    max_output_tokens = load_key("translate_chunk.max_output_tokens", 0)
+    if max_tokens:
+        limits.append(max_tokens)
+    if context_window:
+        limits.append((context_window - prompt_overhead_tokens(theme_prompt)) // (PROMPT_TOKENS_PER_SOURCE_TOKEN + RESPONSE_TOKENS_PER_SOURCE_TOKEN))
+    if max_output_tokens:
+        limits.append(max_output_tokens // RESPONSE_TOKENS_PER_SOURCE_TOKEN)
+    return max(min(limits), 1) if limits else 0
+
 # Function to split text into chunks
-def split_chunks_by_chars(chunk_size=400, max_i=8): 
-    """Split text into chunks based on character count, return a list of multi-line text chunks"""
+def iter_chunks(sentences, max_tokens=None, max_chars=None, max_lines=None):
+    """Group a stream of sentences into multi-line text chunks within max_chars characters, max_lines lines
+    and, unless it is 0, max_tokens estimated tokens (default: chunk_token_budget())"""
+    max_tokens = chunk_token_budget() if max_tokens is None else max_tokens
+    max_chars = max_chars or load_key("translate_chunk.max_chars", 500)
+    max_lines = max_lines or load_key("translate_chunk.max_lines", 10)
+    chunk, chunk_chars, chunk_tokens = [], 0, 0
+    for sentence in sentences:
+        chars = len(sentence) + 1  # + newline
+        tokens = estimate_tokens(sentence) + 1
+        if chunk and (chunk_chars + chars > max_chars or (max_tokens and chunk_tokens + tokens > max_tokens) or len(chunk) == max_lines):
+            yield '\n'.join(chunk).strip()
+            chunk, chunk_chars, chunk_tokens = [], 0, 0
+        chunk.append(sentence)
+        chunk_chars += chars
+        chunk_tokens += tokens
+    if chunk:
+        yield '\n'.join(chunk).strip()
+
+def split_chunks(max_tokens=None, max_chars=None, max_lines=None):
+    """Split text into chunks by characters, lines and estimated tokens, return a list of multi-line text chunks"""
     with open(SENTENCE_SPLIT_FILE, "r", encoding="utf-8") as file:
         sentences = file.read().strip().split('\n')
-
-    chunks = []
-    chunk = ''
-    sentence_count = 0
-    for sentence in sentences:
-        if len(chunk) + len(sentence + '\n') > chunk_size or sentence_count == max_i:
-            chunks.append(chunk.strip())
-            chunk = sentence + '\n'
-            sentence_count = 1
-        else:
-            chunk += sentence + '\n'
-            sentence_count += 1
-    chunks.append(chunk.strip())
-    return chunks
+    return list(iter_chunks(sentences, max_tokens, max_chars, max_lines))
 
 # Get context from surrounding chunks
 def get_previous_content(chunks, chunk_index):
@@ -54,10 +102,93 @@ def translate_chunk(chunk, chunks, theme_prompt, i):
     translation, english_result = translate_lines(chunk, previous_content_prompt, after_content_prompt, things_to_note_prompt, theme_prompt, i)
     return i, english_result, translation
 
+async def translate_chunk_async(chunk, chunks, theme_prompt, i):
+    things_to_note_prompt = search_things_to_note_in_prompt(chunk)
+    previous_content_prompt = get_previous_content(chunks, i)
+    after_content_prompt = get_after_content(chunks, i)
+    translation, english_result = await translate_lines_async(chunk, previous_content_prompt, after_content_prompt, things_to_note_prompt, theme_prompt, i)
+    return i, english_result, translation
+
+def translate_chunks_threaded(chunks, theme_prompt, on_done):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=load_key("max_workers")) as executor:
+        futures = []
+        for i, chunk in enumerate(chunks):
+            future = executor.submit(bind_config_context(translate_chunk), chunk, chunks, theme_prompt, i)
+            futures.append(future)
+
+        results = []
+        for future in concurrent.futures.as_completed(futures):
+            results.append(future.result())
+            on_done()
+    return results
+
+async def translate_chunks_async(chunks, theme_prompt, on_done):
+    """Translate every chunk on one event loop, with ask_gpt_async bounding requests in flight"""
+    async def run(i, chunk):
+        result = await translate_chunk_async(chunk, chunks, theme_prompt, i)
+        on_done()
+        return result
+    try:
+        return await asyncio.gather(*(run(i, chunk) for i, chunk in enumerate(chunks)))
+    finally:
+        await aclose_async_clients()
+
+def iter_translations(chunk_stream, theme_prompt, on_done, executor):
+    """Translate chunks as they arrive from chunk_stream on executor, yielding translate_chunk results in chunk order
+    
+    Chunk i is submitted once chunk i+1 (its trailing context) is known, so translation
+    starts while later chunks are still being produced.
+    """
+    chunks = []
+    pending = collections.deque()
+    def submit(i):
+        pending.append((i, executor.submit(bind_config_context(translate_chunk), chunks[i], chunks, theme_prompt, i)))
+    for chunk in chunk_stream:
+        chunks.append(chunk)
+        if len(chunks) > 1:
+            submit(len(chunks) - 2)
+        while pending and pending[0][1].done():
+            on_done()
+            yield pending.popleft()[1].result()
+    if chunks:
+        submit(len(chunks) - 1)
+    while pending:
+        result = pending.popleft()[1].result()
+        on_done()
+        yield result
+
 # Add similarity calculation function
 def similar(a, b):
     return SequenceMatcher(None, a, b).ratio()
 
+def normalize_chunk(text):
+    return ''.join(text.split('\n')).lower()
+
+def match_result(chunk, i, results_by_index, results):
+    """Return the result translated from chunk i, checking it by index before falling back to a similarity search"""
+    chunk_text = normalize_chunk(chunk)
+    result = results_by_index.get(i)
+    if result is not None:
+        result_text = normalize_chunk(result[1])
+        if result_text == chunk_text:
+            return result
+        similarity = similar(result_text, chunk_text)
+        if similarity >= 0.9:
+            console.print(f"[yellow]Warning: Similar match found (chunk {i}, similarity: {similarity:.3f})[/yellow]")
+            return result
+
+    # Real mismatch: search every result for the chunk's translation
+    matching_results = [(r, similar(normalize_chunk(r[1]), chunk_text)) for r in results]
+    best_match = max(matching_results, key=lambda x: x[1])
+    
+    # Check similarity and handle exceptions
+    if best_match[1] < 0.9:
+        console.print(f"[yellow]Warning: No matching translation found for chunk {i}[/yellow]")
+        raise ValueError(f"Translation matching failed (chunk {i})")
+    elif best_match[1] < 1.0:
+        console.print(f"[yellow]Warning: Similar match found (chunk {i}, similarity: {best_match[1]:.3f})[/yellow]")
+    return best_match[0]
+
 # 🚀 Main function to translate all chunks
 def translate_all():
     # Check if the file exists
@@ -66,9 +197,9 @@ def translate_all():
         return
     
     console.print("[bold green]Start Translating All...[/bold green]")
-    chunks = split_chunks_by_chars(chunk_size=500, max_i=10)
     with open(TERMINOLOGY_FILE, 'r', encoding='utf-8') as file:
         theme_prompt = json.load(file).get('theme')
+    chunks = split_chunks(max_tokens=chunk_token_budget(theme_prompt))
 
     # 🔄 Use concurrent execution for translation
     with Progress(
@@ -77,39 +208,71 @@ def translate_all():
         transient=True,
     ) as progress:
         task = progress.add_task("[cyan]Translating chunks...", total=len(chunks))
-        with concurrent.futures.ThreadPoolExecutor(max_workers=load_key("max_workers")) as executor:
-            futures = []
-            for i, chunk in enumerate(chunks):
-                future = executor.submit(translate_chunk, chunk, chunks, theme_prompt, i)
-                futures.append(future)
-
-            results = []
-            for future in concurrent.futures.as_completed(futures):
-                results.append(future.result())
-                progress.update(task, advance=1)
-
-    results.sort(key=lambda x: x[0])  # Sort results based on original order
+        on_done = lambda: progress.update(task, advance=1)
+        if load_key("llm_async", False):
+            results = asyncio.run(translate_chunks_async(chunks, theme_prompt, on_done))
+        else:
+            results = translate_chunks_threaded(chunks, theme_prompt, on_done)
+
+    save_translation_results(chunks, results)
+
+def split_and_translate_all():
+    """Split sentences by meaning, summarize and translate as one streaming pipeline
+    
+    Replaces step3_2 -> step4_1 -> step4_2 run back to back: finished sentences flow from
+    the splitter into the chunker and chunks are translated while later sentences are
+    still being split. The summary reads the spaCy-split text (same words, different line
+    breaks) and runs alongside the splitter; translation waits only for it and the first chunk.
+    """
+    if os.path.exists(TRANSLATION_RESULTS_FILE):
+        console.print(Panel("🚨 File `translation_results.xlsx` already exists, skipping TRANSLATE ALL.", title="Warning", border_style="yellow"))
+        return
+
+    console.print("[bold green]Start Splitting and Translating...[/bold green]")
+    with open(SENTENCE_SPLITBYNLP_FILE, 'r', encoding='utf-8') as f:
+        sentences = [line.strip() for line in f.readlines()]
+    token_counter = TokenCounter(init_nlp(tokenizer_only=True))
+    split_sentences, chunks = [], []
+    def record(stream, items):
+        for item in stream:
+            items.append(item)
+            yield item
+
+    # summary, split and translate calls share one pool, so at most max_workers LLM requests are in flight
+    with concurrent.futures.ThreadPoolExecutor(max_workers=load_key("max_workers")) as executor:
+        summary_future = executor.submit(bind_config_context(get_summary), SENTENCE_SPLITBYNLP_FILE)
+        split_stream = record(iter_split_sentences(sentences, max_length=load_key("max_split_length"), executor=executor, token_counter=token_counter), split_sentences)
+        first_sentence = list(itertools.islice(split_stream, 1))  # starts the splitter while the summary runs
+        summary_future.result()
+        with open(TERMINOLOGY_FILE, 'r', encoding='utf-8') as file:
+            theme_prompt = json.load(file).get('theme')
+        # the token budget depends on the theme and terms, so chunking starts after the summary
+        chunk_stream = record(iter_chunks(itertools.chain(first_sentence, split_stream), chunk_token_budget(theme_prompt)), chunks)
+
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            transient=True,
+        ) as progress:
+            task = progress.add_task("[cyan]Splitting and translating chunks...", total=None)
+            on_done = lambda: progress.update(task, advance=1)
+            results = list(iter_translations(chunk_stream, theme_prompt, on_done, executor))
+
+    with open(SENTENCE_SPLIT_FILE, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(split_sentences))
+    console.print('[green]✅ All sentences have been successfully split![/green]')
+    save_translation_results(chunks, results)
+
+def save_translation_results(chunks, results):
+    results_by_index = {r[0]: r for r in results}
     
     # 💾 Save results to lists and Excel file
     src_text, trans_text = [], []
     for i, chunk in enumerate(chunks):
         chunk_lines = chunk.split('\n')
         src_text.extend(chunk_lines)
-        
-        # Calculate similarity between current chunk and translation results
-        chunk_text = ''.join(chunk_lines).lower()
-        matching_results = [(r, similar(''.join(r[1].split('\n')).lower(), chunk_text)) 
-                          for r in results]
-        best_match = max(matching_results, key=lambda x: x[1])
-        
-        # Check similarity and handle exceptions
-        if best_match[1] < 0.9:
-            console.print(f"[yellow]Warning: No matching translation found for chunk {i}[/yellow]")
-            raise ValueError(f"Translation matching failed (chunk {i})")
-        elif best_match[1] < 1.0:
-            console.print(f"[yellow]Warning: Similar match found (chunk {i}, similarity: {best_match[1]:.3f})[/yellow]")
-            
-        trans_text.extend(best_match[0][2].split('\n'))
+        result = match_result(chunk, i, results_by_index, results)
+        trans_text.extend(result[2].split('\n'))
     
     # Trim long translation text
     df_text = pd.read_excel(CLEANED_CHUNKS_FILE)
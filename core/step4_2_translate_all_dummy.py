@@ -7,7 +7,7 @@ from core.translate_once import translate_lines
 from core.step4_1_summarize import search_things_to_note_in_prompt
 from core.step8_1_gen_audio_task import check_len_then_trim
 from core.step6_generate_final_timeline import align_timestamp
-from core.config_utils import load_key
+from core.config_utils import load_key, bind_config_context
 from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
@@ -81,7 +81,7 @@ def translate_all():
         with concurrent.futures.ThreadPoolExecutor(max_workers=load_key("max_workers")) as executor:
             futures = []
             for i, chunk in enumerate(chunks):
-                future = executor.submit(translate_chunk, chunk, chunks, theme_prompt, i)
+                future = executor.submit(bind_config_context(translate_chunk), chunk, chunks, theme_prompt, i)
                 futures.append(future)
 
             results = []
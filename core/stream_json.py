@@ -0,0 +1,74 @@
+import json
+import json_repair
+
+class IncrementalJSONObjectParser:
+    """Incrementally parse a streamed top-level JSON object, yielding each member once it is complete
+
+    Feed raw completion text as it arrives; `feed` returns the (key, value) pairs
+    whose values have been closed so far. Anything before the first '{' (e.g. a
+    ```json fence) is ignored.
+
+        parser = IncrementalJSONObjectParser()
+        for delta in stream:
+            for key, value in parser.feed(delta):
+                ...
+    """
+
+    def __init__(self):
+        self._buf = ''
+        self._pos = 0            # next character to scan
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None  # start of the current top-level member
+        self.done = False
+
+    def feed(self, text):
+        items = []
+        if self.done or not text:
+            return items
+        self._buf += text
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+            elif ch in '}]':
+                if self._depth == 1:
+                    items.extend(self._close_member(buf[self._member_start:i]))
+                    self._depth = 0
+                    self.done = True
+                    i += 1
+                    break
+                self._depth -= 1
+            elif ch == ',' and self._depth == 1:
+                items.extend(self._close_member(buf[self._member_start:i]))
+                self._member_start = i + 1
+            i += 1
+        self._pos = i
+        return items
+
+    @staticmethod
+    def _close_member(member):
+        member = member.strip()
+        if not member:
+            return []
+        text = '{' + member + '}'
+        try:
+            parsed = json.loads(text)
+        except ValueError:
+            parsed = json_repair.loads(text)
+        return list(parsed.items()) if isinstance(parsed, dict) else []
@@ -0,0 +1,71 @@
+from collections import deque
+
+def _is_word_char(ch):
+    # CJK and other scripts written without spaces have no word boundaries to respect
+    return ch.isalnum() and ord(ch) < 0x2E80
+
+class TermMatcher:
+    """Aho-Corasick automaton over a glossary, matched case-insensitively in one pass
+
+    A term whose first/last character is a (non-CJK) letter or digit only matches
+    where it isn't glued to another letter or digit, so "AI" does not match inside
+    "said" while CJK terms still match anywhere.
+
+        matcher = TermMatcher(['Machine Learning', 'CNN', '神经网络'])
+        matcher.find('CNNs are machine learning models')  # -> [0]
+    """
+
+    def __init__(self, terms):
+        self.terms = [str(term).lower() for term in terms]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for term_id, term in enumerate(self.terms):
+            if not term:
+                continue
+            node = 0
+            for ch in term:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(term_id)
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _at_boundary(self, text, start, end):
+        term_text = text[start:end]
+        if _is_word_char(term_text[0]) and start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if _is_word_char(term_text[-1]) and end < len(text) and _is_word_char(text[end]):
+            return False
+        return True
+
+    def find(self, text):
+        """Return the sorted ids of the terms occurring in text"""
+        text = str(text).lower()
+        found = set()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for term_id in self._out[node]:
+                if term_id not in found and self._at_boundary(text, i + 1 - len(self.terms[term_id]), i + 1):
+                    found.add(term_id)
+        return sorted(found)
@@ -1,6 +1,7 @@
 import os, sys
+import asyncio
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core.ask_gpt import ask_gpt
+from core.ask_gpt import ask_gpt, ask_gpt_async
 from core.prompts_storage import generate_shared_prompt, get_prompt_faithfulness, get_prompt_expressiveness
 from rich.panel import Panel
 from rich.console import Console
@@ -8,6 +9,8 @@ from rich.table import Table
 from rich import box
 from core.config_utils import load_key
 from core.language_utils import normalize_language
+from core.translation_memory import get_translation_memory
+from core.step4_1_summarize import get_glossary_digest
 
 console = Console()
 
@@ -23,62 +26,165 @@ def valid_translate_result(result: dict, required_keys: list, required_sub_keys:
 
     return {"status": "success", "message": "Translation completed"}
 
-def translate_lines(lines, previous_content_prompt, after_cotent_prompt, things_to_note_prompt, summary_prompt, index = 0):
+def valid_faith(response_data):
+    return valid_translate_result(response_data, ['1'], ['direct'])
+
+def valid_express(response_data):
+    return valid_translate_result(response_data, ['1'], ['free'])
+
+VALID_DEFS = {'faithfulness': valid_faith, 'expressiveness': valid_express}
+SUB_KEYS = {'faithfulness': 'direct', 'expressiveness': 'free'}
+
+def request_translation(prompt, step_name, lines, index):
+    """Run one translation step; with llm_stream each line is validated and shown as soon as it arrives"""
+    log_title = f'translate_{step_name}'
+    if not load_key("llm_stream", False):
+        return ask_gpt(prompt, response_json=True, valid_def=VALID_DEFS[step_name], log_title=log_title)
+
+    sub_key = SUB_KEYS[step_name]
+    line_count = len(lines.split('\n'))
+    # extra or missing line numbers (merged/split lines) are left to plan_repair once the stream ends
+    def valid_line(key, item):
+        if not str(key).isdigit():
+            return {"status": "error", "message": f"Unexpected item {key}, expected a line number"}
+        if not isinstance(item, dict) or sub_key not in item:
+            return {"status": "error", "message": f"Missing required sub-key(s) in item {key}: {sub_key}"}
+        return {"status": "success", "message": "Line translated"}
+
+    result = {}
+    for key, item in ask_gpt(prompt, response_json=True, valid_def=VALID_DEFS[step_name], log_title=log_title, stream=True, valid_item=valid_line):
+        result[key] = item
+        console.print(f"[dim]Block {index} {step_name} {key}/{line_count}: {item[sub_key]}[/dim]")
+    # a retry mid-stream can deliver lines out of order
+    return dict(sorted(result.items(), key=lambda kv: int(kv[0])))
+
+def get_language_pair():
+    return normalize_language(load_key("whisper.detected_language")), normalize_language(load_key("target_language"))
+
+def is_same_language():
     # 检查源语言和目标语言是否相同
-    src_language = normalize_language(load_key("whisper.detected_language"))
-    target_language = normalize_language(load_key("target_language"))
+    src_language, target_language = get_language_pair()
+    return src_language == target_language
+
+def get_memory_context():
+    """Model and terminology the memory's translations are only valid for"""
+    return f'{load_key("api.model")}|{get_glossary_digest()}'
+
+def check_translation_memory(lines, index):
+    """Return (translation, memory_prompt): the full translation if every line is an exact memory hit,
+    otherwise None plus a prompt section listing earlier translations of identical or similar lines"""
+    memory = get_translation_memory()
+    if memory is None:
+        return None, None
+    src_language, target_language = get_language_pair()
+    threshold = load_key("translation_memory.fuzzy_threshold", 0.85)
+    context = get_memory_context()
+    hits = [memory.lookup(src_language, target_language, line, threshold, context) for line in lines.split('\n')]
+    if all(hit is not None and hit[1] == 1.0 for hit in hits):
+        console.print(f'[green]♻️ Block {index} fully covered by translation memory, skipping LLM[/green]')
+        return '\n'.join(hit[0] for hit in hits), None
+    references = [f'- "{source}" → "{translation}"' for translation, _, source in filter(None, hits)]
+    if not references:
+        return None, None
+    return None, "Earlier translations of identical or similar lines, reuse their wording where it fits:\n" + '\n'.join(references)
+
+def remember_translation(lines, translate_result):
+    memory = get_translation_memory()
+    if memory is None:
+        return
+    src_language, target_language = get_language_pair()
+    memory.add(src_language, target_language, zip(lines.split('\n'), translate_result.split('\n')), get_memory_context())
+
+def check_translation_result(lines, result, step_name, index, retry):
+    """True if result has one item per source line, otherwise warn (if retries remain) and return False"""
+    if len(lines.split('\n')) == len(result):
+        return True
+    if retry != 2:
+        console.print(f'[yellow]⚠️ {step_name.capitalize()} translation of block {index} failed, Retry...[/yellow]')
+    return False
+
+def _normalize_origin(text):
+    return ''.join(str(text).split()).lower()
+
+def plan_repair(lines, result):
+    """Match result items to source lines by their echoed `origin`
     
-    if src_language == target_language:
-        console.print("[yellow]Source and target languages are the same, skipping translation...[/yellow]")
-        return lines, lines
+    Returns (aligned, runs): aligned maps 1-based line numbers to their item, runs lists
+    the missing or merged lines as runs of consecutive line numbers. None when the
+    result can't be aligned (no origins) or nothing usable came back.
+    """
+    source_lines = lines.split('\n')
+    if not all(isinstance(item, dict) and 'origin' in item for item in result.values()):
+        return None
+    by_origin = {}
+    for key, item in result.items():
+        by_origin.setdefault(_normalize_origin(item['origin']), []).append(key)
+    aligned, used = {}, set()
+    for n, line in enumerate(source_lines, 1):
+        keys = [key for key in by_origin.get(_normalize_origin(line), []) if key not in used]
+        if keys:
+            key = str(n) if str(n) in keys else keys[0]
+            used.add(key)
+            aligned[n] = result[key]
+    if not aligned:
+        return None
+    runs = []
+    for n in range(1, len(source_lines) + 1):
+        if n in aligned:
+            continue
+        if runs and runs[-1][-1] == n - 1:
+            runs[-1].append(n)
+        else:
+            runs.append([n])
+    return aligned, runs
 
-    shared_prompt = generate_shared_prompt(previous_content_prompt, after_cotent_prompt, summary_prompt, things_to_note_prompt)
+def repair_context(lines, run, previous_content_prompt, after_content_prompt):
+    """Neighbouring lines around a run of line numbers, falling back to the block's own context at its edges"""
+    source_lines = lines.split('\n')
+    first, last = run[0] - 1, run[-1] - 1
+    previous = source_lines[max(first - 3, 0):first] or previous_content_prompt
+    after = source_lines[last + 1:last + 3] or after_content_prompt
+    return previous, after
 
-    # Retry translation if the length of the original text and the translated text are not the same, or if the specified key is missing
-    def retry_translation(prompt, step_name):
-        def valid_faith(response_data):
-            return valid_translate_result(response_data, ['1'], ['direct'])
-        def valid_express(response_data):
-            return valid_translate_result(response_data, ['1'], ['free'])
-        for retry in range(3):
-            if step_name == 'faithfulness':
-                result = ask_gpt(prompt+retry* " ", response_json=True, valid_def=valid_faith, log_title=f'translate_{step_name}')
-            elif step_name == 'expressiveness':
-                result = ask_gpt(prompt+retry* " ", response_json=True, valid_def=valid_express, log_title=f'translate_{step_name}')
-            if len(lines.split('\n')) == len(result):
-                return result
-            if retry != 2:
-                console.print(f'[yellow]⚠️ {step_name.capitalize()} translation of block {index} failed, Retry...[/yellow]')
-        raise ValueError(f'[red]❌ {step_name.capitalize()} translation of block {index} failed after 3 retries. Please check `output/gpt_log/error.json` for more details.[/red]')
+def run_lines(lines, run):
+    source_lines = lines.split('\n')
+    return '\n'.join(source_lines[n - 1] for n in run)
 
-    ## Step 1: Faithful to the Original Text
-    prompt1 = get_prompt_faithfulness(lines, shared_prompt)
-    faith_result = retry_translation(prompt1, 'faithfulness')
+def merge_repair(lines, aligned, runs, repairs, step_name, index):
+    """Fill the runs with their repaired items; returns the full result keyed '1'..'n', or None if a repair came back short"""
+    for run, repair in zip(runs, repairs):
+        if not check_translation_result(run_lines(lines, run), repair, step_name, index, retry=2):
+            return None
+        for n, item in zip(run, repair.values()):
+            aligned[n] = item
+    console.print(f'[green]🔧 {step_name.capitalize()} translation of block {index} repaired, {sum(len(run) for run in runs)} line(s) re-translated[/green]')
+    return {str(n): aligned[n] for n in sorted(aligned)}
 
+def translation_failed(step_name, index):
+    return ValueError(f'[red]❌ {step_name.capitalize()} translation of block {index} failed after 3 retries. Please check `output/gpt_log/error.json` for more details.[/red]')
+
+def finish_faithfulness(faith_result):
+    """Normalize the faithful result; returns the final text when reflect_translate is off, else None"""
     for i in faith_result:
         faith_result[i]["direct"] = faith_result[i]["direct"].replace('\n', ' ')
 
     # If reflect_translate is False or not set, use faithful translation directly
-    reflect_translate = load_key('reflect_translate')
-    if not reflect_translate:
-        # If reflect_translate is False or not set, use faithful translation directly
-        translate_result = "\n".join([faith_result[i]["direct"].strip() for i in faith_result])
-        
-        table = Table(title="Translation Results", show_header=False, box=box.ROUNDED)
-        table.add_column("Translations", style="bold")
-        for i, key in enumerate(faith_result):
-            table.add_row(f"[cyan]Origin:  {faith_result[key]['origin']}[/cyan]")
-            table.add_row(f"[magenta]Direct:  {faith_result[key]['direct']}[/magenta]")
-            if i < len(faith_result) - 1:
-                table.add_row("[yellow]" + "-" * 50 + "[/yellow]")
-        
-        console.print(table)
-        return translate_result, lines
-
-    ## Step 2: Express Smoothly  
-    prompt2 = get_prompt_expressiveness(faith_result, lines, shared_prompt)
-    express_result = retry_translation(prompt2, 'expressiveness')
+    if load_key('reflect_translate'):
+        return None
+    translate_result = "\n".join([faith_result[i]["direct"].strip() for i in faith_result])
+    
+    table = Table(title="Translation Results", show_header=False, box=box.ROUNDED)
+    table.add_column("Translations", style="bold")
+    for i, key in enumerate(faith_result):
+        table.add_row(f"[cyan]Origin:  {faith_result[key]['origin']}[/cyan]")
+        table.add_row(f"[magenta]Direct:  {faith_result[key]['direct']}[/magenta]")
+        if i < len(faith_result) - 1:
+            table.add_row("[yellow]" + "-" * 50 + "[/yellow]")
+    
+    console.print(table)
+    return translate_result
 
+def finish_expressiveness(lines, faith_result, express_result, index):
     table = Table(title="Translation Results", show_header=False, box=box.ROUNDED)
     table.add_column("Translations", style="bold")
     for i, key in enumerate(express_result):
@@ -96,6 +202,101 @@ def translate_lines(lines, previous_content_prompt, after_cotent_prompt, things_
         console.print(Panel(f'[red]❌ Translation of block {index} failed, Length Mismatch, Please check `output/gpt_log/translate_expressiveness.json`[/red]'))
         raise ValueError(f'Origin ···{lines}···,\nbut got ···{translate_result}···')
 
+    return translate_result
+
+def translate_lines(lines, previous_content_prompt, after_cotent_prompt, things_to_note_prompt, summary_prompt, index = 0):
+    if is_same_language():
+        console.print("[yellow]Source and target languages are the same, skipping translation...[/yellow]")
+        return lines, lines
+
+    memory_result, memory_prompt = check_translation_memory(lines, index)
+    if memory_result is not None:
+        return memory_result, lines
+
+    shared_prompt = generate_shared_prompt(previous_content_prompt, after_cotent_prompt, summary_prompt, things_to_note_prompt, memory_prompt)
+
+    def repair_prompt(step_name, run, faith_result=None):
+        previous, after = repair_context(lines, run, previous_content_prompt, after_cotent_prompt)
+        repair_shared_prompt = generate_shared_prompt(previous, after, summary_prompt, things_to_note_prompt, memory_prompt)
+        if step_name == 'faithfulness':
+            return get_prompt_faithfulness(run_lines(lines, run), repair_shared_prompt)
+        faith_items = list(faith_result.values())
+        return get_prompt_expressiveness({str(k): faith_items[n - 1] for k, n in enumerate(run, 1)}, run_lines(lines, run), repair_shared_prompt)
+
+    # Retry translation if the length of the original text and the translated text are not the same, or if the specified key is missing
+    # A result with dropped or merged lines is first repaired by re-translating only those lines
+    def retry_translation(prompt, step_name, faith_result=None):
+        for retry in range(3):
+            result = request_translation(prompt+retry* " ", step_name, lines, index)
+            if check_translation_result(lines, result, step_name, index, retry):
+                return result
+            plan = plan_repair(lines, result)
+            if plan is not None:
+                aligned, runs = plan
+                repairs = [request_translation(repair_prompt(step_name, run, faith_result), step_name, run_lines(lines, run), index) for run in runs]
+                repaired = merge_repair(lines, aligned, runs, repairs, step_name, index)
+                if repaired is not None:
+                    return repaired
+        raise translation_failed(step_name, index)
+
+    ## Step 1: Faithful to the Original Text
+    prompt1 = get_prompt_faithfulness(lines, shared_prompt)
+    faith_result = retry_translation(prompt1, 'faithfulness')
+    translate_result = finish_faithfulness(faith_result)
+
+    ## Step 2: Express Smoothly  
+    if translate_result is None:
+        prompt2 = get_prompt_expressiveness(faith_result, lines, shared_prompt)
+        express_result = retry_translation(prompt2, 'expressiveness', faith_result)
+        translate_result = finish_expressiveness(lines, faith_result, express_result, index)
+
+    remember_translation(lines, translate_result)
+    return translate_result, lines
+
+async def translate_lines_async(lines, previous_content_prompt, after_cotent_prompt, things_to_note_prompt, summary_prompt, index = 0):
+    """Coroutine version of translate_lines built on ask_gpt_async"""
+    if is_same_language():
+        console.print("[yellow]Source and target languages are the same, skipping translation...[/yellow]")
+        return lines, lines
+
+    memory_result, memory_prompt = check_translation_memory(lines, index)
+    if memory_result is not None:
+        return memory_result, lines
+
+    shared_prompt = generate_shared_prompt(previous_content_prompt, after_cotent_prompt, summary_prompt, things_to_note_prompt, memory_prompt)
+
+    def repair_prompt(step_name, run, faith_result=None):
+        previous, after = repair_context(lines, run, previous_content_prompt, after_cotent_prompt)
+        repair_shared_prompt = generate_shared_prompt(previous, after, summary_prompt, things_to_note_prompt, memory_prompt)
+        if step_name == 'faithfulness':
+            return get_prompt_faithfulness(run_lines(lines, run), repair_shared_prompt)
+        faith_items = list(faith_result.values())
+        return get_prompt_expressiveness({str(k): faith_items[n - 1] for k, n in enumerate(run, 1)}, run_lines(lines, run), repair_shared_prompt)
+
+    async def request(prompt, step_name):
+        return await ask_gpt_async(prompt, response_json=True, valid_def=VALID_DEFS[step_name], log_title=f'translate_{step_name}')
+
+    async def retry_translation(prompt, step_name, faith_result=None):
+        for retry in range(3):
+            result = await request(prompt+retry* " ", step_name)
+            if check_translation_result(lines, result, step_name, index, retry):
+                return result
+            plan = plan_repair(lines, result)
+            if plan is not None:
+                aligned, runs = plan
+                repairs = await asyncio.gather(*(request(repair_prompt(step_name, run, faith_result), step_name) for run in runs))
+                repaired = merge_repair(lines, aligned, runs, repairs, step_name, index)
+                if repaired is not None:
+                    return repaired
+        raise translation_failed(step_name, index)
+
+    faith_result = await retry_translation(get_prompt_faithfulness(lines, shared_prompt), 'faithfulness')
+    translate_result = finish_faithfulness(faith_result)
+    if translate_result is None:
+        express_result = await retry_translation(get_prompt_expressiveness(faith_result, lines, shared_prompt), 'expressiveness', faith_result)
+        translate_result = finish_expressiveness(lines, faith_result, express_result, index)
+
+    remember_translation(lines, translate_result)
     return translate_result, lines
 
 
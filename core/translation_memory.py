@@ -0,0 +1,147 @@
+import os, sys, json
+import re
+import threading
+import unicodedata
+import zlib
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.config_utils import load_key
+
+# MinHash signature = BANDS * ROWS hashes; two lines become fuzzy candidates when any band matches
+BANDS = 8
+ROWS = 4
+NGRAM = 3
+_PRIME = (1 << 61) - 1
+_SEEDS = [((i * 0x9E3779B1 + 0x7F4A7C15) % _PRIME, (i * 0x85EBCA77 + 0xC2B2AE3D) % _PRIME) for i in range(BANDS * ROWS)]
+
+def _is_punct(ch):
+    return unicodedata.category(ch).startswith('P')
+
+def normalize_sentence(text):
+    """Case-, width- and spacing-insensitive form used as the memory key
+
+    Punctuation is dropped except inside words and numbers ("3.5", "don't") and at the
+    end of the sentence, so "No." and "No?" stay different entries.
+    """
+    text = re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', str(text)).lower()).strip()
+    end = len(text)
+    while end and (_is_punct(text[end - 1]) or text[end - 1] == ' '):
+        end -= 1
+    body = ''.join(' ' if _is_punct(ch) and not (0 < i < end - 1 and text[i - 1].isalnum() and text[i + 1].isalnum()) else ch
+                   for i, ch in enumerate(text[:end]))
+    body = re.sub(r'\s+', ' ', body).strip()
+    return body + text[end:].replace(' ', '') if body else ''
+
+def _shingles(norm):
+    compact = norm.replace(' ', '_')
+    if len(compact) <= NGRAM:
+        return {compact}
+    return {compact[i:i + NGRAM] for i in range(len(compact) - NGRAM + 1)}
+
+def _minhash(shingles):
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _SEEDS]
+
+def _bands(signature):
+    return [hash(tuple(signature[i * ROWS:(i + 1) * ROWS])) for i in range(BANDS)]
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+class TranslationMemory:
+    """Persistent (src_lang, tgt_lang, context, normalized sentence) -> translation store shared across videos
+
+    context identifies what produced the translation (model and terminology), so changing
+    either starts from a clean slate instead of returning the old wording.
+
+    Backed by an append-only JSONL file and indexed in memory on first use: a dict for
+    exact matches and MinHash/LSH buckets over character trigrams for near matches,
+    which are then confirmed by their trigram Jaccard similarity.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._exact = {}
+        self._entries = []   # (source, translation, shingles)
+        self._buckets = {}   # (src_lang, tgt_lang, context, band, band_hash) -> [entry id]
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            item = json.loads(line)
+                            self._index(item['src_lang'], item['tgt_lang'], item.get('context', ''), item['source'], item['translation'])
+                        except (ValueError, KeyError):
+                            continue
+            self._loaded = True
+
+    def _index(self, src_lang, tgt_lang, context, source, translation):
+        norm = normalize_sentence(source)
+        if not norm:
+            return False
+        key = (src_lang, tgt_lang, context, norm)
+        is_new = key not in self._exact
+        self._exact[key] = translation
+        if is_new:
+            shingles = _shingles(norm)
+            entry_id = len(self._entries)
+            self._entries.append((source, translation, shingles))
+            for band, band_hash in enumerate(_bands(_minhash(shingles))):
+                self._buckets.setdefault((src_lang, tgt_lang, context, band, band_hash), []).append(entry_id)
+        return is_new
+
+    def lookup(self, src_lang, tgt_lang, sentence, threshold=0.85, context=''):
+        """Return (translation, similarity, matched_source) for the best match above threshold, or None"""
+        self._ensure_loaded()
+        norm = normalize_sentence(sentence)
+        if not norm:
+            return None
+        exact = self._exact.get((src_lang, tgt_lang, context, norm))
+        if exact is not None:
+            return exact, 1.0, sentence
+        shingles = _shingles(norm)
+        candidates = set()
+        for band, band_hash in enumerate(_bands(_minhash(shingles))):
+            candidates.update(self._buckets.get((src_lang, tgt_lang, context, band, band_hash), ()))
+        best = None
+        for entry_id in candidates:
+            source, translation, entry_shingles = self._entries[entry_id]
+            similarity = _jaccard(shingles, entry_shingles)
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (translation, similarity, source)
+        return best
+
+    def add(self, src_lang, tgt_lang, pairs, context=''):
+        """Remember (source, translation) pairs, appending only ones not already stored"""
+        self._ensure_loaded()
+        lines = []
+        with self._lock:
+            for source, translation in pairs:
+                if not str(translation).strip():
+                    continue
+                if self._index(src_lang, tgt_lang, context, source, translation):
+                    lines.append(json.dumps({"src_lang": src_lang, "tgt_lang": tgt_lang, "context": context, "source": source, "translation": translation}, ensure_ascii=False) + '\n')
+            if lines:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.writelines(lines)
+
+_memories = {}
+_memories_lock = threading.Lock()
+
+def get_translation_memory():
+    """The configured TranslationMemory, or None when translation_memory.enabled is off"""
+    if not load_key("translation_memory.enabled", False):
+        return None
+    path = load_key("translation_memory.path", "./_translation_memory/memory.jsonl")
+    with _memories_lock:
+        if path not in _memories:
+            _memories[path] = TranslationMemory(path)
+        return _memories[path]
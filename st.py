@@ -101,18 +101,24 @@ def text_processing_section():
 def process_text():
     with st.spinner(t("Using Whisper for transcription...")):
         step2_whisperX.transcribe()
-    with st.spinner(t("Splitting long sentences...")):  
-        step3_1_spacy_split.split_by_spacy()
-        # todo detected language is same, no need to split by meaning
-        step3_2_splitbymeaning.split_sentences_by_meaning()
-    
     # 检查源语言和目标语言是否相同
     src_language = normalize_language(load_key("whisper.detected_language"))
     target_language = normalize_language(load_key("target_language"))
     
     print(f"src_language: {src_language}, target_language: {target_language}")
+    # splitting by meaning streams straight into translation, nothing to pause in between
+    stream_pipeline = src_language != target_language and load_key("stream_split_translate", False) and not load_key("pause_before_translate")
+
+    with st.spinner(t("Splitting long sentences...")):  
+        step3_1_spacy_split.split_by_spacy()
+        # todo detected language is same, no need to split by meaning
+        if not stream_pipeline:
+            step3_2_splitbymeaning.split_sentences_by_meaning()
     
-    if src_language != target_language:
+    if stream_pipeline:
+        with st.spinner(t("Summarizing and translating...")):
+            step4_2_translate_all.split_and_translate_all()
+    elif src_language != target_language:
         with st.spinner(t("Summarizing and translating...")):
             step4_1_summarize.get_summary()
             if load_key("pause_before_translate"):
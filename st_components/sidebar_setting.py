@@ -2,7 +2,7 @@ import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from st_components.imports_and_utils import ask_gpt
 import streamlit as st
-from core.config_utils import update_key, load_key
+from core.config_utils import update_key, load_key, batch_config_writes
 from translations.translations import translate as t
 from translations.translations import DISPLAY_LANGUAGES
 
@@ -14,6 +14,11 @@ def config_input(label, key, help=None):
     return val
 
 def page_setting():
+    # 一次渲染中的所有配置修改合并为一次 config.yaml 写入
+    with batch_config_writes():
+        _page_setting()
+
+def _page_setting():
     st.header(t("Settings"))
     
     # 分布式下载设置